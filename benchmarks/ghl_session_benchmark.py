@@ -0,0 +1,114 @@
+"""
+Latency benchmark for the pooled GoHighLevel client against a local stub server
+
+Run with: python benchmarks/ghl_session_benchmark.py [--calls 200] [--delay-ms 0]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.ghl_api import GHLClient, get_headers
+from utils.rate_limit import RateLimiter
+
+# Measure the transport, not the production request budget
+UNLIMITED = RateLimiter(rate=1e9, burst=1e9, endpoint_budgets={})
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Answers every GHL endpoint with a small JSON body over HTTP/1.1 keep-alive"""
+
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out as separate writes; without TCP_NODELAY the
+    # delayed-ACK interaction adds ~40 ms to every keep-alive response
+    disable_nagle_algorithm = True
+    delay = 0.0
+
+    def _reply(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            self.rfile.read(length)
+        if self.delay:
+            time.sleep(self.delay)
+        body = json.dumps({"data": [{"id": "acc_1", "type": "instagram", "name": "stub"}]}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = _reply
+    do_POST = _reply
+
+    def log_message(self, format, *args):
+        pass
+
+def start_stub_server(delay):
+    StubHandler.delay = delay
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+def measure(label, call, calls):
+    samples = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        call()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    p95 = samples[int(len(samples) * 0.95) - 1]
+    print(f"{label:<34} mean {statistics.mean(samples):7.3f} ms   "
+          f"p50 {statistics.median(samples):7.3f} ms   p95 {p95:7.3f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--delay-ms", type=float, default=0.0, help="Simulated server processing time")
+    parser.add_argument("--accounts", type=int, default=5, help="Accounts per post in the fan-out scenario")
+    args = parser.parse_args()
+
+    server = start_stub_server(args.delay_ms / 1000)
+    base_url = f"http://127.0.0.1:{server.server_address[1]}/v1/"
+    print(f"Stub server on {base_url}, {args.calls} calls per scenario\n")
+
+    def bare_requests():
+        # What the module did before: no session, headers rebuilt per call
+        requests.get(f"{base_url}social-media-posting/loc/accounts", headers=get_headers()).json()
+
+    def cold_client():
+        client = GHLClient(base_url=base_url, location_id="loc", limiter=UNLIMITED)
+        client.get_social_accounts()
+        client.close()
+
+    warm = GHLClient(base_url=base_url, location_id="loc", limiter=UNLIMITED)
+    warm.get_social_accounts()  # Open the connection before timing
+
+    measure("bare requests.get (cold)", bare_requests, args.calls)
+    measure("new GHLClient per call (cold)", cold_client, args.calls)
+    measure("shared GHLClient (warm)", warm.get_social_accounts, args.calls)
+    measure("shared GHLClient POST (warm)", lambda: warm.create_social_post("bench"), args.calls)
+
+    # Fan-out: one post to several accounts, sequential vs publish_many
+    posts = [{"content": "bench", "account_ids": [f"acc_{i}" for i in range(args.accounts)]}]
+    rounds = max(1, args.calls // 10)
+    print()
+    measure(f"{args.accounts} accounts, sequential", lambda: [
+        warm.create_social_post("bench", account_ids=[account_id])
+        for account_id in posts[0]["account_ids"]
+    ], rounds)
+    measure(f"{args.accounts} accounts, publish_many", lambda: warm.publish_many(posts), rounds)
+
+    warm.close()
+    server.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Throughput of batch text graphic rendering: one process vs the worker pool at several sizes
+
+Each graphic is rendered from a template, encoded as PNG and stored with
+its derivatives, as in a batch calendar run. Worker start-up is excluded,
+since the app keeps one pool for its lifetime.
+
+Run with: python benchmarks/graphics_render_benchmark.py [--graphics 200] [--workers 1 2 4]
+"""
+
+import argparse
+import atexit
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Keep benchmark artifacts out of the real store; workers inherit the environment
+os.environ["APP_DATA_DIR"] = tempfile.mkdtemp(prefix="render-bench-")
+atexit.register(shutil.rmtree, os.environ["APP_DATA_DIR"], ignore_errors=True)
+
+from utils.render_pool import _render_safely, _warm_worker, render_graphics
+from utils.templates import ASPECT_RATIOS
+
+PALETTE = {"primary": "#4267B2", "secondary": "#00b2ff", "background": "#ffffff", "text": "#333333"}
+CONTENT_TYPES = ["educational", "inspirational", "funny", "mixed"]
+
+def make_jobs(count, run):
+    # Topics differ per run: the store skips work for graphics it already holds
+    ratios = list(ASPECT_RATIOS)
+    return [
+        {
+            "topic": f"Why normal thyroid labs don't always mean you feel normal, run {run} part {i}",
+            "content_type": CONTENT_TYPES[i % len(CONTENT_TYPES)],
+            "aspect_ratio": ratios[i % len(ratios)],
+            "palette": PALETTE
+        }
+        for i in range(count)
+    ]
+
+def main():
+    cores = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--graphics", type=int, default=200)
+    parser.add_argument("--workers", type=int, nargs="+",
+                        default=sorted({1, 2, 4, cores}))
+    args = parser.parse_args()
+
+    print(f"{args.graphics} graphics, {cores} CPU core(s)")
+    _warm_worker()
+    start = time.perf_counter()
+    serial = [_render_safely(job, False) for job in make_jobs(args.graphics, "serial")]
+    elapsed = time.perf_counter() - start
+    assert all(serial)
+    baseline = args.graphics / elapsed
+    print(f"{'in-process':>12} {baseline:>8.1f} graphics/s")
+
+    for workers in args.workers:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                                 initializer=_warm_worker) as pool:
+            render_graphics(make_jobs(workers, "warm"), pool=pool, chunksize=1)  # Start and warm every worker
+            start = time.perf_counter()
+            results = render_graphics(make_jobs(args.graphics, workers), pool=pool)
+            elapsed = time.perf_counter() - start
+        assert all(results)
+        rate = args.graphics / elapsed
+        print(f"{workers:>4} workers {rate:>8.1f} graphics/s  ({rate / baseline:.2f}x)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Post History payload benchmark: full-size base64 images vs stored thumbnails
+
+Renders N history images the way st.image does (marshalled into the
+ImageList message the browser receives) and reports message size, media
+bytes the browser then downloads, and time per rerun for:
+
+  data-url   the old history: a 1024x1024 PNG data: URL per item, inline in the message
+  full-bytes full PNG bytes, which Streamlit decodes and shrinks to 300px on every rerun
+  thumbnail  the stored 300px JPEG derivative, passed through as it is
+
+Run with: python benchmarks/history_payload_benchmark.py [--items 100 500 1000] [--distinct 8]
+"""
+
+import argparse
+import base64
+import os
+import sys
+import tempfile
+import time
+from io import BytesIO
+
+import numpy as np
+from PIL import Image
+from streamlit.elements.image import marshall_images
+from streamlit.proto.Image_pb2 import ImageList as ImageListProto
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.artifacts import ArtifactStore
+from utils.media import ImageHandle
+
+def synthetic_photo(seed, size=1024):
+    """A gradient with grain, which compresses about as badly as a generated photo"""
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[0:size, 0:size] / size
+    base = np.stack([x * 255, y * 255, (1 - x) * 200 + rng.integers(0, 55)], axis=-1)
+    noisy = np.clip(base + rng.normal(0, 12, base.shape), 0, 255).astype(np.uint8)
+    buffer = BytesIO()
+    Image.fromarray(noisy).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+def render(sources, media_size):
+    """Marshal every image as st.image(source, width=300) would; return (message bytes, media bytes, seconds)"""
+    start = time.perf_counter()
+    message_bytes = 0
+    for index, source in enumerate(sources):
+        proto = ImageListProto()
+        marshall_images(f"history-{index}", source, None, 300, proto, clamp=False)
+        message_bytes += len(proto.SerializeToString())
+    elapsed = time.perf_counter() - start
+    return message_bytes, sum(media_size(source) for source in sources), elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--items", type=int, nargs="+", default=[100, 500, 1000])
+    parser.add_argument("--distinct", type=int, default=8, help="Distinct images cycled through the history")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        store = ArtifactStore(directory=directory)
+        originals = [synthetic_photo(seed) for seed in range(args.distinct)]
+
+        start = time.perf_counter()
+        images = [store.put_image(ImageHandle(data=data)) for data in originals]
+        save_ms = (time.perf_counter() - start) / len(images) * 1000
+        thumbs = [store.derivative(image, "thumb") for image in images]
+
+        print(f"{args.distinct} distinct images: PNG {np.mean([len(d) for d in originals]) / 1024:.0f} KB, "
+              f"thumbnail {np.mean([os.path.getsize(t.path) for t in thumbs]) / 1024:.0f} KB, "
+              f"store + derivatives {save_ms:.0f} ms each")
+
+        data_urls = [f"data:image/png;base64,{base64.b64encode(data).decode()}" for data in originals]
+        thumb_sizes = {t.path: os.path.getsize(t.path) for t in thumbs}
+        variants = {
+            "data-url": (data_urls, lambda source: 0),
+            "full-bytes": (originals, lambda source: 0),  # Resized copy size not observable without a runtime
+            "thumbnail": ([t.path for t in thumbs], lambda source: thumb_sizes[source]),
+        }
+
+        print(f"{'items':>6} {'variant':<11} {'message MB':>11} {'media MB':>9} {'rerun ms':>9}")
+        for count in args.items:
+            for name, (pool, media_size) in variants.items():
+                sources = [pool[i % len(pool)] for i in range(count)]
+                message_bytes, media_bytes, elapsed = render(sources, media_size)
+                print(f"{count:>6} {name:<11} {message_bytes / 1e6:>11.2f} {media_bytes / 1e6:>9.2f} {elapsed * 1000:>9.0f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Post History rerun cost as the content library grows: every item vs one page of summaries
+
+Measures the library and outbox work behind one rerun of the Post History tab
+and the number of widgets it renders. A third of the items have a failed
+outbox job, which never settles:
+
+  all-items  a status check per unsettled item, then every full item (caption, prompt, image
+             reference), as the unpaginated history did
+  page       a count, one page of summaries, one outbox query to sync that page's statuses,
+             and one item opened
+
+Run with: python benchmarks/post_history_benchmark.py [--items 100 1000 5000] [--page-size 20]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.library import ContentLibrary
+from utils.media import ImageHandle
+from utils.outbox import connect, enqueue_post, get_jobs, summarize_status
+
+WIDGETS_PER_ITEM = 5  # Expander, image, two text areas and a button
+WIDGETS_PER_ROW = 4   # Topic, type, status and the Open toggle
+
+UNSETTLED = ["queued", "publishing", "partially published", "failed"]
+
+def fill(library, outbox, count):
+    image = ImageHandle(path="/tmp/placeholder.png", artifact_id="placeholder.png", prompt="p" * 300)
+    for i in range(count):
+        item_id = library.add(f"Why normal thyroid labs don't always mean you feel normal, part {i}", caption="c" * 1200,
+                              image_prompt="p" * 400, image=image, content_type=["Educational", "Funny"][i % 2],
+                              created_at=f"2026-{1 + i % 12:02d}-{1 + i % 28:02d} 10:{i % 60:02d}:00")
+        if i % 3 == 0:
+            job_ids = enqueue_post(f"post {i}", account_ids=["account"], db=outbox)
+            outbox.execute("UPDATE outbox SET status = 'failed' WHERE id = ?", (job_ids[0],))
+            library.add_outbox_jobs(item_id, job_ids, status="failed")
+
+def timed(fn, repeat=5):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--items", type=int, nargs="+", default=[100, 1000, 5000])
+    parser.add_argument("--page-size", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'items':>6} {'variant':<10} {'rerun ms':>9} {'widgets':>8}")
+    for count in args.items:
+        with tempfile.TemporaryDirectory() as directory:
+            library = ContentLibrary(path=os.path.join(directory, "library.sqlite3"))
+            outbox = connect(os.path.join(directory, "outbox.sqlite3"))
+            fill(library, outbox, count)
+
+            def all_items():
+                for item in library.list_summaries(statuses=UNSETTLED):
+                    status = summarize_status(get_jobs(item["outbox_jobs"], db=outbox)) if item["outbox_jobs"] else None
+                    if status and status != item["status"]:
+                        library.update(item["id"], status=status)
+                library.list_items()
+
+            def page():
+                library.count(content_type="Educational")
+                summaries = library.list_summaries(limit=args.page_size, content_type="Educational")
+                job_ids = [job_id for summary in summaries for job_id in summary["outbox_jobs"]]
+                library.sync_statuses(summaries, {job["id"]: job for job in get_jobs(job_ids, db=outbox)})
+                library.get(summaries[0]["id"])
+
+            all_ms = timed(all_items)
+            page_ms = timed(page)
+            print(f"{count:>6} {'all-items':<10} {all_ms:>9.1f} {count * WIDGETS_PER_ITEM:>8}")
+            print(f"{count:>6} {'page':<10} {page_ms:>9.1f} {args.page_size * WIDGETS_PER_ROW + WIDGETS_PER_ITEM:>8}")
+
+if __name__ == "__main__":
+    main()
@@ -10,8 +10,51 @@ GHL_API_KEY = os.getenv("GHL_API_KEY", "eyJhbGciOiJIUzI1NiIsInR5cCI6IkpXVCJ9.eyJ
 GHL_BASE_URL = "https://rest.gohighlevel.com/v1/"
 LOCATION_ID = os.getenv("LOCATION_ID", "UaOOnAHiyiTRLWTsSU5K")  # From the API key
 
+# Media uploads: images are uploaded once and posts reference the hosted URL.
+# Point MEDIA_UPLOAD_URL at `python -m utils.media serve` for a local stand-in.
+MEDIA_UPLOAD_URL = os.getenv("MEDIA_UPLOAD_URL", f"{GHL_BASE_URL}medias/upload-file")
+
+# GoHighLevel HTTP connection settings
+GHL_POOL_SIZE = int(os.getenv("GHL_POOL_SIZE", "10"))  # Keep-alive connections per host
+GHL_CONNECT_TIMEOUT = float(os.getenv("GHL_CONNECT_TIMEOUT", "5"))  # Seconds
+GHL_READ_TIMEOUT = float(os.getenv("GHL_READ_TIMEOUT", "30"))  # Seconds
+GHL_MAX_CONCURRENCY = int(os.getenv("GHL_MAX_CONCURRENCY", "5"))  # Parallel publish requests
+GHL_ACCOUNTS_TTL = float(os.getenv("GHL_ACCOUNTS_TTL", "300"))  # Seconds before social accounts are refreshed
+GHL_ACCOUNTS_ERROR_TTL = float(os.getenv("GHL_ACCOUNTS_ERROR_TTL", "30"))  # Seconds a failed fetch is reused before trying again
+
+# GoHighLevel rate limiting and retries
+GHL_RATE_LIMIT = float(os.getenv("GHL_RATE_LIMIT", "8"))  # Requests per second across all endpoints
+GHL_RATE_BURST = int(os.getenv("GHL_RATE_BURST", "80"))  # Stays under the 100 requests / 10 s quota
+GHL_ENDPOINT_BUDGETS = {  # Endpoint path: (requests per second, burst)
+    "accounts": (1, 5),
+    "posts": (2, 10),
+    "posts/list": (4, 20),
+    "media": (1, 5)
+}
+GHL_MAX_RETRIES = int(os.getenv("GHL_MAX_RETRIES", "4"))
+GHL_BACKOFF_BASE = float(os.getenv("GHL_BACKOFF_BASE", "0.5"))  # Seconds
+GHL_BACKOFF_MAX = float(os.getenv("GHL_BACKOFF_MAX", "30"))  # Seconds
+
+# Local storage for caches, queues and generated files
+DATA_DIR = os.getenv("APP_DATA_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".appdata"))
+ARTIFACT_STORE_MAX_MB = float(os.getenv("ARTIFACT_STORE_MAX_MB", "500"))  # Generated images kept before LRU eviction
+ARTIFACT_MAX_AGE_DAYS = float(os.getenv("ARTIFACT_MAX_AGE_DAYS", "30"))  # Unused images older than this are removed
+
+# Publishing outbox (drained by `python -m utils.outbox work`)
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "20"))  # Jobs claimed per worker poll
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "5"))  # Before a job is marked failed
+OUTBOX_POLL_INTERVAL = float(os.getenv("OUTBOX_POLL_INTERVAL", "2"))  # Seconds between empty polls
+
 # OpenAI Configuration
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")  # Reuse identical completions
+LLM_CACHE_MAX_MB = float(os.getenv("LLM_CACHE_MAX_MB", "50"))  # Disk budget before LRU eviction
+PIPELINE_WORKERS = int(os.getenv("PIPELINE_WORKERS", "4"))  # Background threads for image stages
+IMAGE_JOB_WORKERS = int(os.getenv("IMAGE_JOB_WORKERS", "4"))  # Background image generations (variants included) running at once
+IMAGE_JOB_POLL_INTERVAL = float(os.getenv("IMAGE_JOB_POLL_INTERVAL", "2"))  # Seconds between UI refreshes while one runs
+BATCH_WORKERS = int(os.getenv("BATCH_WORKERS", "4"))  # Posts generated at once in batch mode
+RENDER_PROCESSES = int(os.getenv("RENDER_PROCESSES", str(os.cpu_count() or 1)))  # Processes for batch text graphics
+CAPTION_SIMILARITY_THRESHOLD = float(os.getenv("CAPTION_SIMILARITY_THRESHOLD", "0.5"))  # Estimated Jaccard over word 3-grams
 
 # Content Generation Settings
 DEFAULT_TONE = "friendly and professional"
@@ -7,24 +7,41 @@ import os
 import datetime
 import sys
 from PIL import Image
-import io
-import base64
 import pandas as pd
 import json
+import itertools
+import math
+import time
 
 # Add the current directory to Python's path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 # Now import from utils
-from utils.ghl_api import get_social_accounts, create_social_post, get_posts
-from utils.content_gen import generate_topic, generate_caption, generate_image_prompt
-from utils.image_gen import (
-    generate_image, 
-    generate_transparent_image,
-    edit_image_with_mask,
-    generate_image_with_references,
-    create_graphic_with_text
+from utils.ghl_api import (
+    get_cached_social_accounts,
+    warm_social_accounts,
+    invalidate_social_accounts,
+    iter_posts,
+    get_request_stats
 )
+from utils.outbox import PUBLISHED, enqueue_post, get_jobs, retry_job, summarize_status, worker_alive
+from utils.content_gen import stream_caption
+from utils.image_gen import edit_image_with_mask, generate_image_with_references
+from utils.artifacts import artifact_store, thumbnail, preview
+from utils.backgrounds import BACKGROUND_STYLES
+from utils.templates import ASPECT_RATIOS, TEMPLATES
+from utils.pipeline import render_item_image, render_variant, run_post_pipeline, format_timings, keep_variant
+from utils.batch import CONTENT_TYPES, plan_calendar, generate_calendar
+from utils.similarity import get_caption_index
+from utils.jobs import JobRunner, DONE, FAILED
+from utils.single_flight import get_coalescing_stats
+from utils.library import get_content_library
+from config import CAPTION_SIMILARITY_THRESHOLD, IMAGE_JOB_WORKERS, IMAGE_JOB_POLL_INTERVAL
+
+try:
+    from streamlit_autorefresh import st_autorefresh
+except ImportError:  # Without it, progress is checked with a button
+    st_autorefresh = None
 
 # Page configuration with improved styling
 st.set_page_config(
@@ -79,9 +96,8 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-# Initialize session state for content tracking
-if 'created_content' not in st.session_state:
-    st.session_state.created_content = []
+# Generated content is kept in the shared, persistent content library
+content_library = get_content_library()
 
 if 'metrics' not in st.session_state:
     st.session_state.metrics = {
@@ -91,47 +107,105 @@ if 'metrics' not in st.session_state:
         'engagement_rate': 0
     }
 
+# Start loading social accounts now so the Preview & Publish column doesn't wait for them
+warm_social_accounts()
+
 # Initialize session state for image prompt
 if 'image_prompt' not in st.session_state:
     st.session_state.image_prompt = ""
 
+if 'image_jobs' not in st.session_state:
+    st.session_state.image_jobs = []
+
+# Library id of the item in the editor; None until it has been added
+if 'current_item_id' not in st.session_state:
+    st.session_state.current_item_id = None
+
+# Candidate images for the variant picker, and the jobs still rendering them
+if 'image_variants' not in st.session_state:
+    st.session_state.image_variants = []
+    st.session_state.variant_jobs = []
+
+# Image generations run here, outside the script thread, so reruns don't throw them away
+@st.cache_resource
+def get_image_job_runner():
+    return JobRunner(max_workers=IMAGE_JOB_WORKERS, name="image-jobs")
+
+# Calendar batches take minutes and already fan out internally, so they run one at a time
+@st.cache_resource
+def get_calendar_job_runner():
+    return JobRunner(max_workers=1, name="calendar-jobs")
+
+def ensure_current_item(content_type=None):
+    """Id of the library item being edited, adding it as a draft if it isn't in the library yet"""
+    if st.session_state.get("current_item_id") is None:
+        st.session_state.current_item_id = content_library.add(
+            topic=st.session_state.current_topic,
+            caption=st.session_state.get("edited_caption", st.session_state.current_caption),
+            image_prompt=st.session_state.image_prompt,
+            content_type=content_type
+        )
+    return st.session_state.current_item_id
+
 # Function to generate image
-def generate_image_content(topic, prompt, content_type, use_text_graphic, quality, transparent_bg):
-    with st.spinner("Creating image..."):
-        try:
-            if use_text_graphic:
-                # Create text-based graphic
-                image_path = create_graphic_with_text(topic, content_type.lower())
-                
-                # Handle local path vs URL
-                if image_path.startswith("http"):
-                    return image_path
-                else:
-                    # Load image from local path and convert to displayable format
-                    with open(image_path, "rb") as img_file:
-                        img_bytes = img_file.read()
-                        encoded = base64.b64encode(img_bytes).decode()
-                        return f"data:image/png;base64,{encoded}"
+def submit_image_job(item_id, topic, prompt, content_type, use_text_graphic, quality, transparent_bg,
+                     background_style=None, aspect_ratio="1:1", template="classic", variant=None):
+    """Start rendering the image in the background; the library item gets it once it is ready
+
+    With a variant index the image goes to the variant picker instead.
+    """
+    image_args = (topic, prompt, content_type, use_text_graphic, quality, transparent_bg, background_style,
+                  aspect_ratio, template)
+    meta = {"item_id": item_id, "variant": variant}
+    if variant is None:
+        job_id = get_image_job_runner().submit(render_item_image, item_id, *image_args, label=topic, meta=meta)
+    else:
+        job_id = get_image_job_runner().submit(render_variant, variant, *image_args,
+                                               label=f"{topic} (variant {variant + 1})", meta=meta)
+        st.session_state.variant_jobs.append(job_id)
+    st.session_state.image_jobs.append(job_id)
+    return job_id
+
+def discard_variants(chosen=None):
+    """Close the variant picker: unchosen variants leave the artifact store and unfinished ones are ignored"""
+    keep_variant(st.session_state.image_variants, chosen, keep=[st.session_state.get("current_image")])
+    st.session_state.image_variants = []
+    st.session_state.variant_jobs = []
+
+def collect_image_jobs():
+    """Apply finished image jobs to this session: current image, variants and errors
+
+    The jobs themselves store images in the content library.
+    """
+    runner = get_image_job_runner()
+    still_running = []
+    for job_id in st.session_state.image_jobs:
+        job = runner.get(job_id)
+        if job is None:
+            continue  # Lost with a server restart
+        if job["status"] not in (DONE, FAILED):
+            still_running.append(job_id)
+            continue
+        runner.forget(job_id)
+        image, meta = job["result"], job["meta"]
+        if job["status"] == FAILED or not image:
+            if meta["variant"] is not None:
+                st.warning(f"Variant {meta['variant'] + 1} failed and was skipped: {job['error'] or 'no image returned'}")
             else:
-                # Generate image using the edited prompt
-                if transparent_bg:
-                    # Use transparent background option
-                    image_url = generate_transparent_image(
-                        prompt, 
-                        content_type.lower(),
-                        quality=quality
-                    )
-                else:
-                    # Use standard image generation
-                    image_url = generate_image(
-                        prompt, 
-                        content_type.lower(),
-                        quality=quality
-                    )
-                return image_url
-        except Exception as e:
-            st.error(f"Error generating image: {e}")
-            return None
+                st.error(f"Error generating image for \"{job['label']}\": {job['error'] or 'no image returned'}")
+            continue
+        if meta["variant"] is not None:
+            if job_id in st.session_state.variant_jobs:
+                st.session_state.image_variants.append(image)
+            else:
+                # The picker was closed while this one rendered
+                keep_variant([image], None, keep=[st.session_state.get("current_image")])
+            continue
+        if meta["item_id"] == st.session_state.get("current_item_id"):
+            st.session_state.current_image = image
+    st.session_state.image_jobs = still_running
+
+collect_image_jobs()
 
 # App header
 st.markdown('<h1 class="main-header">Hypothyroid Content Creation Agent</h1>', unsafe_allow_html=True)
@@ -180,9 +254,25 @@ with st.sidebar:
         
     hashtags = st.slider("Number of Hashtags", 1, 10, 5)
     
+    avoid_duplicate_captions = st.checkbox("Regenerate near-duplicate captions", value=True,
+                                           help="Write a new caption when one is too similar to an earlier post")
+    
     use_text_graphic = st.checkbox("Create text-based graphic instead of image", value=False, 
                                   help="Create a clean, branded text graphic instead of a generated image")
     
+    background_style = None
+    if use_text_graphic:
+        background_choice = st.selectbox(
+            "Background style",
+            ["Auto"] + [style.title() for style in BACKGROUND_STYLES],
+            index=0,
+            help="Auto picks a style to suit the content type"
+        )
+        background_style = None if background_choice == "Auto" else background_choice.lower()
+        graphic_template = st.selectbox("Graphic layout", [name.title() for name in TEMPLATES]).lower()
+    else:
+        graphic_template = "classic"
+    
     # Add an option to enable prompt editing
     enable_prompt_editing = st.checkbox("Enable image prompt editing", value=True,
                                       help="Allow editing the image prompt before generation")
@@ -203,6 +293,13 @@ with st.sidebar:
         help="Higher quality produces better images but takes longer to generate"
     )
     
+    aspect_ratio = st.selectbox(
+        "Aspect Ratio",
+        list(ASPECT_RATIOS),
+        index=0,
+        help="Square for feeds, 4:5 for portrait posts, 9:16 for stories and reels"
+    )
+    
     # Transparent background option
     transparent_background = st.checkbox("Use transparent background", value=False,
                                       help="Create images with transparent backgrounds (requires PNG format)")
@@ -224,7 +321,7 @@ with st.sidebar:
         )
 
 # Main content area with tabs
-tab1, tab2, tab3, tab4 = st.tabs(["Create Content", "Post History", "Advanced Image Tools", "Settings"])
+tab1, tab2, tab3, tab4, tab5 = st.tabs(["Create Content", "Post History", "Advanced Image Tools", "Settings", "Content Calendar"])
 
 with tab1:
     col1, col2 = st.columns([1, 1])
@@ -236,50 +333,70 @@ with tab1:
         # Topic generation
         if st.button("Generate New Post Ideas", type="primary", key="generate_content"):
             with st.spinner("Creating content ideas..."):
-                # Generate topic
-                topic = generate_topic(content_type.lower())
-                st.session_state.current_topic = topic
+                caption_preview = st.empty()
                 
-                # Generate image prompt
-                image_prompt = generate_image_prompt(topic)
-                st.session_state.image_prompt = image_prompt
+                def stream_caption_stage(topic):
+                    # Runs in this script thread while the image renders in the background
+                    caption_stream = stream_caption(topic, content_type.lower(), hashtags)
+                    with caption_preview.container():
+                        st.markdown(f"**{topic}**")
+                        st.write_stream(caption_stream)
+                    return caption_stream.text
                 
-                # Generate caption with enhanced parameters
-                caption = generate_caption(topic, content_type.lower(), hashtags)
-                st.session_state.current_caption = caption
+                new_item_ids = []
                 
-                # Auto-generate image if enabled
-                if auto_generate_image:
-                    image_url = generate_image_content(
-                        topic, 
-                        image_prompt, 
-                        content_type, 
-                        use_text_graphic,
-                        image_quality,
-                        transparent_background
+                def submit_pipeline_image(topic, image_prompt):
+                    # The new item goes into the library now; its image arrives with a later rerun
+                    new_item_ids.append(content_library.add(topic=topic, image_prompt=image_prompt, content_type=content_type))
+                    return submit_image_job(
+                        new_item_ids[0], topic, image_prompt, content_type, use_text_graphic,
+                        image_quality, transparent_background, background_style, aspect_ratio, graphic_template
                     )
-                    if image_url:
-                        st.session_state.current_image_url = image_url
-                        
-                        # Store content in library
-                        content_item = {
-                            "id": len(st.session_state.created_content) + 1,
-                            "topic": topic,
-                            "caption": caption,
-                            "image_prompt": image_prompt,
-                            "image_url": image_url,
-                            "created_at": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                            "content_type": content_type,
-                            "published": False
-                        }
-                        st.session_state.created_content.append(content_item)
-                        
-                        # Update metrics
-                        st.session_state.metrics['content_created'] += 1
+                
+                try:
+                    result = run_post_pipeline(
+                        content_type=content_type,
+                        hashtags=hashtags,
+                        make_image=auto_generate_image,
+                        use_text_graphic=use_text_graphic,
+                        quality=image_quality,
+                        transparent_bg=transparent_background,
+                        background_style=background_style,
+                        aspect_ratio=aspect_ratio,
+                        template=graphic_template,
+                        caption_stage=stream_caption_stage,
+                        avoid_duplicates=avoid_duplicate_captions,
+                        submit_image=submit_pipeline_image
+                    )
+                except Exception as e:
+                    st.error(f"Error generating content: {e}")
+                    result = None
+                caption_preview.empty()
+                
+                if result:
+                    topic = result["topic"]
+                    caption = result["caption"]
+                    image_prompt = result["image_prompt"]
+                    st.session_state.current_topic = topic
+                    st.session_state.image_prompt = image_prompt
+                    st.session_state.current_caption = caption
+                    st.session_state.last_pipeline_timings = result["timings"]
+                    st.session_state.caption_similarity = (result["caption_similarity"], result["similar_caption"])
+                    
+                    # Start over: the previous post's image and variants no longer apply
+                    discard_variants()
+                    st.session_state.pop("current_image", None)
+                    st.session_state.current_item_id = new_item_ids[0] if new_item_ids else None
+                    
+                    # The item was stored when its image job started; add the caption
+                    if new_item_ids:
+                        content_library.update(new_item_ids[0], caption=caption)
         
         # Display generated content if available
         if 'current_topic' in st.session_state:
             st.success("✅ Content generated successfully!")
+            if 'last_pipeline_timings' in st.session_state:
+                st.caption(f"Generation time: {format_timings(st.session_state.last_pipeline_timings)}")
             
             # Topic display
             st.markdown("### Topic")
@@ -288,6 +405,9 @@ with tab1:
             # Caption display
             st.markdown("### Caption")
             caption_value = st.session_state.current_caption
+            similarity, similar_caption = st.session_state.get("caption_similarity", (0.0, None))
+            if similarity >= CAPTION_SIMILARITY_THRESHOLD:
+                st.warning(f"This caption is {similarity:.0%} similar to an earlier one: \"{similar_caption[:120]}...\"")
             st.text_area("Edit caption if needed:", value=caption_value, height=200, key="edited_caption")
             
             # Image prompt display and editing
@@ -312,68 +432,106 @@ with tab1:
             
             # Generate/Regenerate image buttons - FIXED: removed nested columns
             # Generate image button (only show if not auto-generated or no image exists)
-            if not auto_generate_image or 'current_image_url' not in st.session_state:
+            if not auto_generate_image or 'current_image' not in st.session_state:
                 if st.button("Generate Image", type="primary"):
-                    image_url = generate_image_content(
+                    # The item goes into the content library now; the finished job adds its image
+                    submit_image_job(
+                        ensure_current_item(content_type),
                         st.session_state.current_topic,
                         st.session_state.image_prompt,
                         content_type,
                         use_text_graphic,
                         image_quality,
-                        transparent_background
+                        transparent_background,
+                        background_style,
+                        aspect_ratio,
+                        graphic_template
                     )
-                    
-                    if image_url:
-                        st.session_state.current_image_url = image_url
-                        
-                        # Update content library if not already done
-                        if auto_generate_image == False:
-                            content_item = {
-                                "id": len(st.session_state.created_content) + 1,
-                                "topic": st.session_state.current_topic,
-                                "caption": st.session_state.get("edited_caption", st.session_state.current_caption),
-                                "image_prompt": st.session_state.image_prompt,
-                                "image_url": image_url,
-                                "created_at": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                                "content_type": content_type,
-                                "published": False
-                            }
-                            st.session_state.created_content.append(content_item)
-                            st.session_state.metrics['content_created'] += 1
             
             # Regenerate image button (only show if image exists)
-            if 'current_image_url' in st.session_state:
+            if 'current_image' in st.session_state:
                 if st.button("Regenerate Image"):
-                    image_url = generate_image_content(
+                    # The finished job replaces the current image and the one in the content library
+                    submit_image_job(
+                        ensure_current_item(content_type),
                         st.session_state.current_topic,
                         st.session_state.image_prompt,
                         content_type,
                         use_text_graphic,
                         image_quality,
-                        transparent_background
+                        transparent_background,
+                        background_style,
+                        aspect_ratio,
+                        graphic_template
                     )
-                    
-                    if image_url:
-                        st.session_state.current_image_url = image_url
-                        
-                        # Update the image URL in the content library
-                        for item in st.session_state.created_content:
-                            if item.get("topic") == st.session_state.current_topic:
-                                item["image_url"] = image_url
-                                item["image_prompt"] = st.session_state.image_prompt
+            
+            # Several candidates at once, each offered below as soon as it is ready
+            variant_count = st.number_input("Number of variants", min_value=2, max_value=4, value=3, key="variant_count")
+            if st.button("Generate Variants"):
+                discard_variants()
+                item_id = ensure_current_item(content_type)
+                for index in range(int(variant_count)):
+                    submit_image_job(
+                        item_id,
+                        st.session_state.current_topic,
+                        st.session_state.image_prompt,
+                        content_type,
+                        use_text_graphic,
+                        image_quality,
+                        transparent_background,
+                        background_style,
+                        aspect_ratio,
+                        graphic_template,
+                        variant=index
+                    )
+            
+            # Images still generating; the page refreshes itself until they are done
+            for job in get_image_job_runner().get_many(st.session_state.image_jobs):
+                started = job["started_at"] or job["created_at"]
+                state = "Generating" if job["started_at"] else "Waiting to generate"
+                st.info(f"⏳ {state} image for \"{job['label']}\" ({time.time() - started:.0f}s). You can keep editing meanwhile.")
+            if get_image_job_runner().pending(st.session_state.image_jobs):
+                if st_autorefresh:
+                    # A browser-side timer reruns the script like any widget would, so buttons don't fire again
+                    st_autorefresh(interval=int(IMAGE_JOB_POLL_INTERVAL * 1000), key="image_job_poll")
+                else:
+                    st.button("Check image progress")
+            
+            # Pick one variant; the others are removed from the artifact store
+            if st.session_state.image_variants:
+                st.markdown("### Choose a variant")
+                variants = st.session_state.image_variants
+                chosen_variant = None
+                for index, (variant_col, variant) in enumerate(zip(st.columns(len(variants)), variants)):
+                    with variant_col:
+                        st.image(preview(variant).display(), caption=f"Variant {index + 1}", use_column_width=True)
+                        if st.button("Use this", key=f"use_variant_{index}"):
+                            chosen_variant = variant
+                discard_clicked = st.button("Discard variants")
+                
+                if chosen_variant or discard_clicked:
+                    discard_variants(chosen_variant)
+                    if chosen_variant:
+                        st.session_state.current_image = chosen_variant
+                        content_library.update(ensure_current_item(content_type), image=chosen_variant)
+                    st.rerun()
             
             # Option to regenerate caption only
             if st.button("Regenerate Caption Only"):
-                with st.spinner("Regenerating caption..."):
-                    new_caption = generate_caption(st.session_state.current_topic, content_type.lower(), hashtags)
-                    st.session_state.current_caption = new_caption
-                    
-                    # Update the caption in the content library
-                    for item in st.session_state.created_content:
-                        if item.get("topic") == st.session_state.current_topic:
-                            item["caption"] = new_caption
-                    
-                    st.experimental_rerun()
+                # Stream the new caption in place; the rerun then shows it in the editor
+                caption_stream = stream_caption(st.session_state.current_topic, content_type.lower(), hashtags, fresh=True)
+                st.write_stream(caption_stream)
+                new_caption = caption_stream.text
+                st.session_state.current_caption = new_caption
+                caption_index = get_caption_index()
+                similarity, match = caption_index.most_similar(new_caption)
+                st.session_state.caption_similarity = (similarity, match["text"] if match else None)
+                caption_index.add(new_caption, topic=st.session_state.current_topic, content_type=content_type.lower())
+                
+                # Update the caption in the content library
+                content_library.update(ensure_current_item(content_type), caption=new_caption)
+                
+                st.experimental_rerun()
                         
         st.markdown('</div>', unsafe_allow_html=True)
     
@@ -381,22 +539,27 @@ with tab1:
         st.markdown('<div class="content-section">', unsafe_allow_html=True)
         st.subheader("Preview & Publish")
         
-        if 'current_image_url' in st.session_state and st.session_state.current_image_url is not None:
+        if st.session_state.get('current_image') is not None:
             try:
-                st.image(st.session_state.current_image_url, caption="Generated Image", use_column_width=True)
+                st.image(preview(st.session_state.current_image).display(), caption="Generated Image", use_column_width=True)
+                if not st.session_state.current_image.is_hosted:
+                    st.download_button("Download full-size image", data=st.session_state.current_image.data,
+                                       file_name="post_image.png", mime=st.session_state.current_image.mime_type)
                 
                 # Publish options
                 st.markdown("### Publish Options")
                 
-                # Get social accounts
-                if 'social_accounts' not in st.session_state:
-                    with st.spinner("Loading your social accounts..."):
-                        st.session_state.social_accounts = get_social_accounts()
+                # Get social accounts (shared, auto-refreshing cache)
+                if st.button("Refresh accounts", help="Reload accounts connected in GoHighLevel"):
+                    invalidate_social_accounts()
+                
+                with st.spinner("Loading your social accounts..."):
+                    social_accounts = get_cached_social_accounts()
                 
-                if st.session_state.social_accounts:
+                if social_accounts:
                     # Create multiselect for account selection
                     account_options = {}
-                    for account in st.session_state.social_accounts.get('data', []):
+                    for account in social_accounts.get('data', []):
                         account_options[f"{account.get('type', 'Unknown')} - {account.get('name', 'Unnamed')}"] = account.get('id')
                     
                     selected_accounts = st.multiselect(
@@ -410,50 +573,48 @@ with tab1:
                     publish_now = st.button("Publish Now", type="primary")
                     schedule_post = st.button("Schedule Post")
                     
-                    if publish_now and selected_account_ids:
-                        with st.spinner("Publishing post..."):
-                            result = create_social_post(
-                                content=st.session_state.get("edited_caption", st.session_state.current_caption),
-                                media_urls=[st.session_state.current_image_url],
-                                account_ids=selected_account_ids
-                            )
-                            
-                            if result:
-                                st.success("Post published successfully!")
-                                # Update metrics
-                                st.session_state.metrics['posts_published'] += 1
-                                
-                                # Update content item
-                                for item in st.session_state.created_content:
-                                    if item.get("topic") == st.session_state.current_topic:
-                                        item["published"] = True
-                                        item["published_at"] = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                            else:
-                                st.error("Failed to publish post. Please try again.")
+                    # Posts go into the durable outbox; the worker process publishes them
+                    scheduled_datetime = None
+                    if schedule_post and selected_account_ids and auto_schedule:
+                        scheduled_datetime = datetime.datetime.combine(schedule_date, schedule_time)
+                    
+                    if (publish_now or scheduled_datetime) and selected_account_ids:
+                        publish_caption = st.session_state.get("edited_caption", st.session_state.current_caption)
+                        # Hand edits can drift from the generated caption; index what actually goes out
+                        caption_index = get_caption_index()
+                        if caption_index.most_similar(publish_caption)[0] < 1.0:
+                            caption_index.add(publish_caption, topic=st.session_state.current_topic, published=True)
+                        job_ids = enqueue_post(
+                            content=publish_caption,
+                            media_urls=[st.session_state.current_image],
+                            account_ids=selected_account_ids,
+                            scheduled_time=scheduled_datetime.isoformat() if scheduled_datetime else None,
+                            content_ref=ensure_current_item(content_type)
+                        )
+                        # The same post to the same account is queued once; failed ones are requeued
+                        publish_jobs = get_jobs(job_ids)
+                        queued_count = sum(1 for job in publish_jobs if job["status"] != PUBLISHED)
+                        published_count = len(publish_jobs) - queued_count
+                        
+                        if queued_count and scheduled_datetime:
+                            st.success(f"Post queued for {scheduled_datetime.strftime('%B %d, %Y at %I:%M %p')} on {queued_count} account(s). Track it in Post History.")
+                        elif queued_count:
+                            st.success(f"Post queued for {queued_count} account(s). Track it in Post History.")
+                        if published_count:
+                            st.warning(f"This exact post was already published to {published_count} account(s), so it was not queued again there. Edit the caption to post it again.")
+                        if queued_count and not worker_alive():
+                            st.warning("No publishing worker is running. Start one with `python -m utils.outbox work`.")
+                        
+                        # Link the outbox jobs to the content item
+                        content_library.add_outbox_jobs(
+                            ensure_current_item(content_type),
+                            job_ids,
+                            status=summarize_status(publish_jobs),
+                            scheduled_for=scheduled_datetime.strftime("%Y-%m-%d %H:%M:%S") if scheduled_datetime else None
+                        )
                     
                     elif schedule_post and selected_account_ids:
-                        if auto_schedule:
-                            scheduled_datetime = datetime.datetime.combine(schedule_date, schedule_time)
-                            with st.spinner("Scheduling post..."):
-                                result = create_social_post(
-                                    content=st.session_state.get("edited_caption", st.session_state.current_caption),
-                                    media_urls=[st.session_state.current_image_url],
-                                    scheduled_time=scheduled_datetime.isoformat(),
-                                    account_ids=selected_account_ids
-                                )
-                                
-                                if result:
-                                    st.success(f"Post scheduled for {scheduled_datetime.strftime('%B %d, %Y at %I:%M %p')}")
-                                    
-                                    # Update content item
-                                    for item in st.session_state.created_content:
-                                        if item.get("topic") == st.session_state.current_topic:
-                                            item["scheduled"] = True
-                                            item["scheduled_for"] = scheduled_datetime.strftime("%Y-%m-%d %H:%M:%S")
-                                else:
-                                    st.error("Failed to schedule post. Please try again.")
-                        else:
-                            st.warning("Please enable auto-scheduling in the sidebar first.")
+                        st.warning("Please enable auto-scheduling in the sidebar first.")
                 else:
                     st.warning("No social media accounts found. Please connect accounts in GoHighLevel.")
             except Exception as e:
@@ -461,7 +622,9 @@ with tab1:
                 st.warning("Failed to load image. Please try generating a new one.")
         
         elif 'current_topic' in st.session_state:
-            if auto_generate_image:
+            if st.session_state.image_jobs:
+                st.info("Your image is generating in the background and will appear here when it is ready.")
+            elif auto_generate_image:
                 st.info("Image generation in progress. If no image appears, try clicking 'Regenerate Image'.")
             else:
                 st.info("Click 'Generate Image' to create an image for this content.")
@@ -473,9 +636,47 @@ with tab1:
 with tab2:
     st.subheader("Post History")
     
-    # Display metrics
+    # Metrics are filled in below, once this page's statuses are synced with the outbox
     col1, col2, col3 = st.columns(3)
+    st.session_state.metrics["content_created"] = content_library.count()
+    
+    # Content library: one page of summaries per rerun; caption and image load only for opened items
+    st.markdown("### Content Library")
+    
+    filter_cols = st.columns(4)
+    with filter_cols[0]:
+        type_filter = st.selectbox("Type", ["All"] + content_library.content_types(), key="history_type")
+    with filter_cols[1]:
+        status_filter = st.selectbox(
+            "Status", ["All", "Draft", "Queued", "Publishing", "Published", "Partially published", "Failed"],
+            key="history_status"
+        )
+    with filter_cols[2]:
+        date_filter = st.date_input("Created between", value=(), key="history_dates")
+    with filter_cols[3]:
+        library_page_size = st.selectbox("Per page", [10, 20, 50], index=1, key="library_page_size")
+    
+    library_filters = {
+        "content_type": None if type_filter == "All" else type_filter,
+        "statuses": None if status_filter == "All" else [status_filter.lower()],
+        "since": date_filter[0] if date_filter else None,
+        "until": date_filter[-1] if date_filter else None  # One date picked so far: just that day
+    }
+    matching_count = content_library.count(**library_filters)
+    page_count = max(1, math.ceil(matching_count / library_page_size))
+    library_page = st.number_input(f"Page (of {page_count})", min_value=1, max_value=page_count, value=1)
+    st.caption(f"{matching_count} of {st.session_state.metrics['content_created']} items")
     
+    summaries = content_library.list_summaries(
+        limit=library_page_size, offset=(library_page - 1) * library_page_size, **library_filters
+    )
+    # The worker writes publishing status back to the library; this page is also checked in one outbox query
+    page_job_ids = [job_id for summary in summaries for job_id in summary["outbox_jobs"]]
+    outbox_jobs = {job["id"]: job for job in get_jobs(page_job_ids)} if page_job_ids else {}
+    content_library.sync_statuses(summaries, outbox_jobs)
+    st.session_state.metrics["posts_published"] = content_library.count(status="published")
+    
+    # Display metrics
     with col1:
         st.metric("Content Created", st.session_state.metrics["content_created"])
     
@@ -489,37 +690,81 @@ with tab2:
             publish_percent = int((st.session_state.metrics["posts_published"] / st.session_state.metrics["content_created"]) * 100)
         st.metric("Publication Rate", f"{publish_percent}%")
     
-    # Content library 
-    st.markdown("### Content Library")
+    for summary in summaries:
+        row_cols = st.columns([6, 2, 2, 1])
+        row_cols[0].markdown(f"**{summary['topic']}**  \n{summary['created_at']}")
+        row_cols[1].write(summary["content_type"] or "Unknown")
+        row_cols[2].write(summary["status"].capitalize())
+        if not row_cols[3].toggle("Open", key=f"history_open_{summary['id']}"):
+            continue
+        
+        item = content_library.get(summary["id"])
+        with st.container(border=True):
+            # Per-account publishing progress
+            for job_id in item["outbox_jobs"]:
+                job = outbox_jobs.get(job_id)
+                if not job:
+                    continue
+                job_accounts = ", ".join(json.loads(job["payload"])["account_ids"]) or "default accounts"
+                st.caption(f"{job_accounts}: {job['status']} (attempt {job['attempts']})")
+                if job["status"] == "failed":
+                    st.error(job["last_error"] or "Publishing failed")
+                    if st.button("Retry", key=f"retry_job_{job_id}"):
+                        retry_job(job_id)
+                        content_library.update(item["id"], status=summarize_status(get_jobs(item["outbox_jobs"])))
+                        st.rerun()
+            
+            if item['image']:
+                try:
+                    st.image(thumbnail(item['image']).display(), width=300)
+                except Exception as e:
+                    st.error(f"Error displaying image: {e}")
+            
+            st.text_area("Caption:", value=item['caption'] or 'No caption', height=150, key=f"caption_{item['id']}", disabled=True)
+            
+            # Display image prompt
+            st.text_area("Image Prompt:", value=item['image_prompt'] or 'No prompt', height=100, key=f"prompt_{item['id']}", disabled=True)
+            
+            # Reuse content button
+            if st.button("Reuse Content", key=f"reuse_{item['id']}"):
+                st.session_state.current_item_id = item['id']
+                st.session_state.current_topic = item['topic']
+                st.session_state.current_caption = item['caption']
+                st.session_state.image_prompt = item['image_prompt'] or ''
+                st.session_state.current_image = item['image']
+                st.info("Content loaded to editor. Switch to the 'Create Content' tab to make edits.")
     
-    if st.session_state.created_content:
-        for item in reversed(st.session_state.created_content):
-            with st.expander(f"{item.get('topic', 'Content Item')} - {item.get('created_at', 'Unknown date')}"):
-                # FIXED: Removed nested columns
-                st.write(f"**Topic:** {item.get('topic', 'No topic')}")
-                st.write(f"**Type:** {item.get('content_type', 'Unknown')}")
-                st.write(f"**Status:** {'Published' if item.get('published') else 'Draft'}")
-                
-                if item.get('image_url'):
-                    try:
-                        st.image(item['image_url'], width=300)
-                    except Exception as e:
-                        st.error(f"Error displaying image: {e}")
-                
-                st.text_area("Caption:", value=item.get('caption', 'No caption'), height=150, key=f"caption_{item.get('id')}", disabled=True)
-                
-                # Display image prompt
-                st.text_area("Image Prompt:", value=item.get('image_prompt', 'No prompt'), height=100, key=f"prompt_{item.get('id')}", disabled=True)
-                
-                # Reuse content button
-                if st.button("Reuse Content", key=f"reuse_{item.get('id')}"):
-                    st.session_state.current_topic = item.get('topic')
-                    st.session_state.current_caption = item.get('caption')
-                    st.session_state.image_prompt = item.get('image_prompt', '')
-                    st.session_state.current_image_url = item.get('image_url')
-                    st.info("Content loaded to editor. Switch to the 'Create Content' tab to make edits.")
-    else:
+    if not st.session_state.metrics["content_created"]:
         st.info("No content created yet. Start creating content in the 'Create Content' tab.")
+    elif not summaries:
+        st.info("No content matches these filters.")
+    
+    # Posts already on GoHighLevel, read one page at a time
+    st.markdown("### Published on GoHighLevel")
+    history_page_size = 20
+    
+    if 'remote_posts' not in st.session_state or st.button("Refresh from GoHighLevel"):
+        st.session_state.remote_posts = []
+        st.session_state.remote_posts_iter = iter_posts(page_size=history_page_size)
+        st.session_state.remote_posts_done = False
+    
+    if not st.session_state.remote_posts_done and st.button("Load more posts" if st.session_state.remote_posts else "Load posts"):
+        with st.spinner("Loading posts..."):
+            page = list(itertools.islice(st.session_state.remote_posts_iter, history_page_size))
+            st.session_state.remote_posts.extend(page)
+            if len(page) < history_page_size:
+                st.session_state.remote_posts_done = True
+    
+    for post in st.session_state.remote_posts:
+        summary = post.get('summary') or post.get('content') or 'Untitled post'
+        with st.expander(f"{summary[:80]} - {post.get('createdAt', 'Unknown date')}"):
+            st.write(f"**Status:** {post.get('status', 'Unknown')}")
+            st.write(summary)
+            for media_url in post.get('mediaUrls') or []:
+                st.image(media_url, width=300)
+    
+    if st.session_state.remote_posts_done and not st.session_state.remote_posts:
+        st.info("No posts found on GoHighLevel yet.")
 
 with tab3:
     st.subheader("Advanced Image Tools")
@@ -561,15 +806,12 @@ with tab3:
         # Check if we have at least one reference image and a prompt
         if (ref_image1 is not None or ref_image2 is not None) and st.session_state.composition_prompt:
             with st.spinner("Creating composition from reference images..."):
-                # Save uploaded images to temp files
+                # Store uploaded images so the API client can open them as files
                 reference_paths = []
                 
-                for i, img in enumerate([ref_image1, ref_image2, ref_image3, ref_image4]):
+                for img in [ref_image1, ref_image2, ref_image3, ref_image4]:
                     if img is not None:
-                        img_path = f"temp_ref_{i}.png"
-                        with open(img_path, "wb") as f:
-                            f.write(img.getbuffer())
-                        reference_paths.append(img_path)
+                        reference_paths.append(artifact_store.path(artifact_store.put(img.getvalue(), img.type)))
                 
                 # Generate image with references
                 result_image = generate_image_with_references(
@@ -581,12 +823,12 @@ with tab3:
                 # Display the result
                 if result_image:
                     st.success("Composition created successfully!")
-                    st.image(result_image, caption="Generated Composition", use_column_width=True)
+                    st.image(preview(result_image).display(), caption="Generated Composition", use_column_width=True)
                     
                     # Add save option
                     st.download_button(
                         "Download Composition",
-                        data=open(result_image, "rb").read() if not result_image.startswith("data:") and not result_image.startswith("http") else result_image,
+                        data=result_image.data or result_image.url,
                         file_name="composition.png",
                         mime="image/png"
                     )
@@ -633,14 +875,9 @@ with tab3:
         # Check if we have source, mask, and a prompt
         if source_image is not None and mask_image is not None and st.session_state.mask_prompt:
             with st.spinner("Creating edited image..."):
-                # Save uploaded images to temp files
-                source_path = "temp_source.png"
-                with open(source_path, "wb") as f:
-                    f.write(source_image.getbuffer())
-                
-                mask_path = "temp_mask.png"
-                with open(mask_path, "wb") as f:
-                    f.write(mask_image.getbuffer())
+                # Store uploaded images so the API client can open them as files
+                source_path = artifact_store.path(artifact_store.put(source_image.getvalue(), source_image.type))
+                mask_path = artifact_store.path(artifact_store.put(mask_image.getvalue(), mask_image.type))
                 
                 # Generate edited image
                 result_image = edit_image_with_mask(
@@ -653,12 +890,12 @@ with tab3:
                 # Display the result
                 if result_image:
                     st.success("Image edited successfully!")
-                    st.image(result_image, caption="Edited Image", use_column_width=True)
+                    st.image(preview(result_image).display(), caption="Edited Image", use_column_width=True)
                     
                     # Add save option
                     st.download_button(
                         "Download Edited Image",
-                        data=open(result_image, "rb").read() if not result_image.startswith("data:") and not result_image.startswith("http") else result_image,
+                        data=result_image.data or result_image.url,
                         file_name="edited_image.png",
                         mime="image/png"
                     )
@@ -703,6 +940,29 @@ with tab4:
         except Exception as e:
             st.error(f"Error saving brand settings: {e}")
 
+    # GoHighLevel API usage since the app process started
+    st.markdown("### GoHighLevel API")
+    request_stats = get_request_stats()
+    stat_cols = st.columns(len(request_stats))
+    for stat_col, (name, count) in zip(stat_cols, request_stats.items()):
+        with stat_col:
+            st.metric(name.replace("_", " ").title(), count)
+    st.caption("Throttled = 429 responses from GoHighLevel. Rate Limited = requests delayed locally to stay under the quota.")
+
+    # Identical OpenAI requests made at the same time share one call
+    st.markdown("### OpenAI Request Coalescing")
+    coalescing_stats = get_coalescing_stats()
+    if coalescing_stats:
+        st.dataframe(
+            pd.DataFrame([{"Request": name.replace("_", " ").title(), **{field.title(): count for field, count in counts.items()}}
+                          for name, counts in coalescing_stats.items()]),
+            use_container_width=True,
+            hide_index=True
+        )
+        st.caption("Coalesced = calls that waited for an identical request already in flight instead of calling OpenAI again.")
+    else:
+        st.caption("No OpenAI requests yet.")
+
     # Image generation settings
     st.markdown("### Image Generation Settings")
     
@@ -754,6 +1014,94 @@ with tab4:
         ```
         """)
 
+with tab5:
+    st.subheader("Content Calendar")
+    st.write("Generate a batch of posts in one run. Image and caption settings come from the sidebar.")
+    
+    plan_by = st.radio("Plan by", ["Number of posts", "Date range"], horizontal=True, key="calendar_plan_by")
+    calendar_start = st.date_input("Start date", datetime.date.today() + datetime.timedelta(days=1), key="calendar_start")
+    if plan_by == "Number of posts":
+        calendar_count = st.number_input("Number of posts (one per day)", min_value=1, max_value=90, value=30, key="calendar_count")
+        calendar_end = None
+    else:
+        calendar_count = None
+        calendar_end = st.date_input("End date", calendar_start + datetime.timedelta(days=29), key="calendar_end")
+    
+    st.markdown("Content mix (relative weights)")
+    mix_cols = st.columns(len(CONTENT_TYPES))
+    calendar_mix = {}
+    for mix_col, mix_type in zip(mix_cols, CONTENT_TYPES):
+        with mix_col:
+            weight = st.number_input(mix_type.title(), min_value=0, max_value=10, value=1 if mix_type != "mixed" else 0, key=f"calendar_mix_{mix_type}")
+        if weight:
+            calendar_mix[mix_type] = weight
+    
+    if st.button("Generate Calendar", type="primary", key="generate_calendar", disabled=bool(st.session_state.get("calendar_job"))):
+        if not calendar_mix:
+            st.warning("Give at least one content type a weight above zero.")
+        elif calendar_end is not None and calendar_end < calendar_start:
+            st.warning("The end date must be on or after the start date.")
+        else:
+            slots = plan_calendar(int(calendar_count) if calendar_count else None, calendar_start, calendar_end, calendar_mix)
+            # Runs in the background so reruns (including progress polling) don't abort it
+            calendar_progress = {"done": 0, "total": len(slots)}
+            st.session_state.calendar_job = get_calendar_job_runner().submit(
+                generate_calendar,
+                slots,
+                hashtags=hashtags,
+                make_images=auto_generate_image,
+                use_text_graphic=use_text_graphic,
+                background_style=background_style,
+                aspect_ratio=aspect_ratio,
+                template=graphic_template,
+                quality=image_quality,
+                avoid_duplicates=avoid_duplicate_captions,
+                on_progress=lambda done, total, entry: calendar_progress.update(done=done),
+                label="calendar",
+                meta={"progress": calendar_progress}
+            )
+            st.session_state.pop("calendar_result", None)
+    
+    if st.session_state.get("calendar_job"):
+        calendar_job = get_calendar_job_runner().get(st.session_state.calendar_job)
+        if calendar_job is None:
+            del st.session_state.calendar_job  # Lost with a server restart
+        elif calendar_job["status"] in (DONE, FAILED):
+            get_calendar_job_runner().forget(calendar_job["id"])
+            del st.session_state.calendar_job
+            if calendar_job["status"] == DONE:
+                entries, calendar_path = calendar_job["result"]
+                st.session_state.calendar_result = {"entries": entries, "path": calendar_path}
+            else:
+                st.error(f"Error generating calendar: {calendar_job['error']}")
+        else:
+            calendar_progress = calendar_job["meta"]["progress"]
+            st.progress(calendar_progress["done"] / max(1, calendar_progress["total"]),
+                        text=f"{calendar_progress['done']}/{calendar_progress['total']} posts ready. You can keep working meanwhile.")
+            if st_autorefresh:
+                st_autorefresh(interval=int(IMAGE_JOB_POLL_INTERVAL * 1000), key="calendar_job_poll")
+            else:
+                st.button("Check calendar progress")
+    
+    if 'calendar_result' in st.session_state:
+        calendar_result = st.session_state.calendar_result
+        st.success(f"{len(calendar_result['entries'])} posts written to {calendar_result['path']}")
+        st.dataframe(
+            pd.DataFrame([
+                {
+                    "Date": entry["date"],
+                    "Type": entry["content_type"].title(),
+                    "Topic": entry.get("topic", ""),
+                    "Image": entry.get("image_path") or entry.get("image_url") or "",
+                    "Status": entry["status"]
+                }
+                for entry in calendar_result["entries"]
+            ]),
+            use_container_width=True
+        )
+        with open(calendar_result["path"], "rb") as calendar_file:
+            st.download_button("Download calendar.jsonl", data=calendar_file.read(), file_name="calendar.jsonl", mime="application/json")
+
 # Add footer
 st.markdown("---")
 st.markdown('<div style="text-align: center; color: #666;">Hypothyroid Content Creator | Developed by Muhammad</div>', unsafe_allow_html=True)
\ No newline at end of file
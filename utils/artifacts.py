@@ -0,0 +1,219 @@
+"""
+Content-addressed store for generated images, replacing ad-hoc temp files in the working directory
+"""
+
+import hashlib
+import mimetypes
+import os
+import tempfile
+import threading
+import time
+from io import BytesIO
+from PIL import Image
+from config import DATA_DIR, ARTIFACT_STORE_MAX_MB, ARTIFACT_MAX_AGE_DAYS
+from utils.media import ImageHandle
+
+# Smaller copies made when an image is stored: name -> (longest side in px, JPEG quality).
+# "thumb" matches the 300px Post History width so Streamlit sends the bytes as they are.
+DERIVATIVES = {
+    "thumb": (300, 75),
+    "preview": (768, 85),
+}
+
+def resize_image(data, max_side, quality=85):
+    """Downscale encoded image bytes to fit max_side and re-encode as JPEG
+
+    JPEG rather than WebP: Streamlit's st.image only passes JPEG, PNG and GIF
+    through untouched and would re-encode a WebP on every rerun.
+    Transparent images are flattened onto white.
+    """
+    with Image.open(BytesIO(data)) as image:
+        image.thumbnail((max_side, max_side), Image.LANCZOS)
+        if image.mode in ("RGBA", "LA", "P"):
+            image = image.convert("RGBA")
+            background = Image.new("RGB", image.size, "white")
+            background.paste(image, mask=image.getchannel("A"))
+            image = background
+        elif image.mode != "RGB":
+            image = image.convert("RGB")
+        buffer = BytesIO()
+        image.save(buffer, format="JPEG", quality=quality, optimize=True)
+    return buffer.getvalue()
+
+class ArtifactStore:
+    """Stores files under the SHA-256 of their bytes, sharded by the first two hex digits
+
+    The artifact ID is "<hash><extension>", so it is stable across runs and
+    identical images are stored once. Writes go to a temp file in the shard
+    and are renamed into place, so readers never see a partial image and
+    concurrent writers of the same bytes are harmless. Files unused for
+    max_age seconds are removed on the first write of each process, and
+    whenever the store outgrows max_bytes the least recently used go until it
+    is back under 90% of the budget. Artifacts for which is_referenced(artifact_id)
+    is true are never evicted, only their derivatives, which are remade on demand.
+    """
+
+    def __init__(self, directory=None, max_bytes=ARTIFACT_STORE_MAX_MB * 1024 * 1024,
+                 max_age=ARTIFACT_MAX_AGE_DAYS * 86400, is_referenced=None):
+        self.directory = directory or os.path.join(DATA_DIR, "artifacts")
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.is_referenced = is_referenced
+        self._size = None  # Computed lazily on the first write
+        self._lock = threading.Lock()
+
+    def path(self, artifact_id):
+        return os.path.join(self.directory, artifact_id[:2], artifact_id)
+
+    def put(self, data, mime_type="image/png"):
+        """Store bytes and return their artifact ID"""
+        extension = mimetypes.guess_extension(mime_type) or ".bin"
+        artifact_id = hashlib.sha256(data).hexdigest() + extension
+        path = self.path(artifact_id)
+        if os.path.exists(path):
+            os.utime(path)  # Same image again: just mark it as recently used
+            return artifact_id
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(temp_path, path)
+
+        with self._lock:
+            if self._size is None:
+                self._evict()  # Also sizes the store
+            else:
+                self._size += len(data)
+                if self._size > self.max_bytes:
+                    self._evict()
+        return artifact_id
+
+    def put_image(self, image, derivatives=True):
+        """Store an ImageHandle's bytes and return a file-backed handle with the same metadata
+
+        The thumbnail and preview are made at the same time while the bytes
+        are in memory. Hosted images (placeholders) have no bytes and are
+        returned unchanged.
+        """
+        if image.is_hosted:
+            return image
+        data = image.data
+        artifact_id = self.put(data, image.mime_type)
+        if derivatives:
+            for name in DERIVATIVES:
+                self._make_derivative(artifact_id, name, data)
+        meta = dict(image.meta, artifact_id=artifact_id)
+        return ImageHandle(path=self.path(artifact_id), mime_type=image.mime_type, **meta)
+
+    def derivative_path(self, artifact_id, name):
+        stem = artifact_id.split(".")[0]
+        return os.path.join(self.directory, "derived", stem[:2], f"{stem}-{name}.jpg")
+
+    def _make_derivative(self, artifact_id, name, data=None):
+        path = self.derivative_path(artifact_id, name)
+        if os.path.exists(path):
+            return path
+        data = data if data is not None else self.get(artifact_id)
+        if data is None:
+            return None
+        max_side, quality = DERIVATIVES[name]
+        resized = resize_image(data, max_side, quality)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(resized)
+        os.replace(temp_path, path)
+        with self._lock:
+            if self._size is not None:
+                self._size += len(resized)
+        return path
+
+    def derivative(self, image, name):
+        """Return a handle for the named derivative of a stored image, making it if it was evicted
+
+        Images outside the store (placeholders, uploads) are returned unchanged.
+        """
+        artifact_id = image.meta.get("artifact_id")
+        if not artifact_id:
+            return image
+        path = self._make_derivative(artifact_id, name)
+        if path is None:
+            return image
+        return ImageHandle(path=path, mime_type="image/jpeg", derivative=name, **image.meta)
+
+    def get(self, artifact_id):
+        """Return the bytes of an artifact, or None if it was never stored or has been evicted"""
+        path = self.path(artifact_id)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)
+            return data
+        except OSError:
+            return None
+
+    def delete(self, artifact_id):
+        """Remove an artifact and its derivatives, e.g. image variants nobody picked"""
+        paths = [self.path(artifact_id)] + [self.derivative_path(artifact_id, name) for name in DERIVATIVES]
+        for path in paths:
+            try:
+                size = os.path.getsize(path)
+                os.remove(path)
+            except OSError:
+                continue
+            with self._lock:
+                if self._size is not None:
+                    self._size -= size
+
+    def _entries(self):
+        """Yield (path, size, mtime) for every stored file"""
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith(".tmp"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                yield path, stat.st_size, stat.st_mtime
+
+    def _evict(self):
+        target = self.max_bytes * 0.9
+        cutoff = time.time() - self.max_age
+        entries = sorted(self._entries(), key=lambda entry: entry[2])
+        self._size = sum(size for _, size, _ in entries)
+        derived = os.path.join(self.directory, "derived") + os.sep
+        for path, size, mtime in entries:
+            if self._size <= target and mtime >= cutoff:
+                break
+            if self.is_referenced and not path.startswith(derived) and self.is_referenced(os.path.basename(path)):
+                continue
+            try:
+                os.remove(path)
+                self._size -= size
+            except OSError:
+                pass
+
+    def evict(self):
+        """Apply the size and age limits now rather than waiting for the next write"""
+        with self._lock:
+            self._evict()
+
+def library_references(artifact_id):
+    """True if a content library item shows this artifact"""
+    from utils.library import get_content_library  # utils.library imports this module
+
+    return get_content_library().references_artifact(artifact_id)
+
+# Library history outlives the store's limits, so its images are kept
+artifact_store = ArtifactStore(is_referenced=library_references)
+
+def thumbnail(image):
+    """Small copy of an image for lists such as Post History"""
+    return artifact_store.derivative(image, "thumb")
+
+def preview(image):
+    """Mid-size copy of an image for on-page previews; downloads use the original"""
+    return artifact_store.derivative(image, "preview")
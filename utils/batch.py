@@ -0,0 +1,195 @@
+"""
+Batch content generation: plan a content calendar and generate every post with bounded concurrency
+
+Headless usage:
+
+    python -m utils.batch --count 30 --mix educational=2,inspirational=1,funny=1
+    python -m utils.batch --start 2026-11-01 --end 2026-11-30 --out calendars/november
+"""
+
+import argparse
+import datetime
+import json
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from config import DATA_DIR, BATCH_WORKERS
+from utils.backgrounds import BACKGROUND_STYLES
+from utils.templates import ASPECT_RATIOS, TEMPLATES
+from utils.artifacts import artifact_store
+from utils.image_gen import graphic_job
+from utils.media import ImageHandle
+from utils.pipeline import run_post_pipeline
+from utils.render_pool import render_graphics
+
+CONTENT_TYPES = ["educational", "inspirational", "funny", "mixed"]
+
+def parse_mix(text):
+    """Parse 'educational=2,funny=1' into {'educational': 2.0, 'funny': 1.0}"""
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip().lower()
+        if name not in CONTENT_TYPES:
+            raise ValueError(f"Unknown content type: {name}")
+        mix[name] = float(weight or 1)
+    return mix
+
+def plan_calendar(count=None, start_date=None, end_date=None, content_mix=None):
+    """Return one slot per post: [{"date": "YYYY-MM-DD", "content_type": ...}, ...]
+
+    Give either a count (one post a day from start_date) or a date range.
+    Content types follow content_mix weights and are spread evenly across the
+    calendar rather than bunched together.
+    """
+    start_date = start_date or datetime.date.today() + datetime.timedelta(days=1)
+    if count is None:
+        if end_date is None:
+            raise ValueError("Give a count or an end date")
+        count = (end_date - start_date).days + 1
+    content_mix = content_mix or {"educational": 1}
+
+    # Weighted round robin: each slot goes to the type furthest behind its share
+    total_weight = sum(content_mix.values())
+    assigned = {content_type: 0 for content_type in content_mix}
+    slots = []
+    for index in range(count):
+        content_type = max(
+            content_mix,
+            key=lambda t: content_mix[t] / total_weight * (index + 1) - assigned[t]
+        )
+        assigned[content_type] += 1
+        slots.append({
+            "date": (start_date + datetime.timedelta(days=index)).isoformat(),
+            "content_type": content_type
+        })
+    return slots
+
+def _save_image(image, images_dir, name):
+    """Write a generated image to images_dir and return its path relative to the calendar"""
+    if image is None or image.is_hosted:
+        return None
+    path = image.save(os.path.join(images_dir, f"{name}.png"))
+    return os.path.relpath(path, os.path.dirname(images_dir))
+
+def generate_calendar(slots, output_dir=None, hashtags=5, make_images=True, use_text_graphic=False,
+                      quality="medium", max_workers=BATCH_WORKERS, on_progress=None, avoid_duplicates=True,
+                      background_style=None, aspect_ratio="1:1", template="classic"):
+    """Generate every slot and write calendar.jsonl plus an images/ directory
+
+    At most max_workers posts are in flight; their image stages share the
+    pipeline pool, except text graphics, which are rendered together in the
+    worker processes of utils.render_pool once every topic is known.
+    Near-duplicate captions are regenerated unless
+    avoid_duplicates is off. on_progress(done, total, entry) is called from the calling
+    thread as each post finishes. Returns (entries sorted by date, path of the
+    JSONL file).
+    """
+    output_dir = output_dir or os.path.join(
+        DATA_DIR, "calendars", datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+    )
+    images_dir = os.path.join(output_dir, "images")
+    os.makedirs(images_dir, exist_ok=True)
+
+    def image_name(index, slot):
+        return f"{index + 1:03d}-{slot['date']}"
+
+    def generate(index, slot):
+        entry = dict(slot, status="draft")
+        try:
+            result = run_post_pipeline(
+                content_type=slot["content_type"],
+                hashtags=hashtags,
+                make_image=make_images and not use_text_graphic,
+                use_text_graphic=use_text_graphic,
+                quality=quality,
+                avoid_duplicates=avoid_duplicates,
+                background_style=background_style,
+                aspect_ratio=aspect_ratio,
+                template=template
+            )
+            entry.update(
+                topic=result["topic"],
+                caption=result["caption"],
+                caption_similarity=round(result["caption_similarity"], 3),
+                image_prompt=result["image_prompt"],
+                image_path=_save_image(result["image"], images_dir, image_name(index, slot)),
+                timings=result["timings"]
+            )
+            if result["image"] and not entry["image_path"]:
+                # Placeholder or remote URL: keep it so the reviewer sees what happened
+                entry["image_url"] = result["image"].url
+        except Exception as e:
+            print(f"Error generating post for {slot['date']}: {e}")
+            entry.update(status="error", error=str(e))
+        return entry
+
+    results = {}
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="batch") as executor:
+        futures = {executor.submit(generate, index, slot): index for index, slot in enumerate(slots)}
+        for future in as_completed(futures):
+            results[futures[future]] = future.result()
+            if on_progress:
+                on_progress(len(results), len(slots), results[futures[future]])
+
+    if make_images and use_text_graphic:
+        drafts = [index for index in sorted(results) if results[index]["status"] == "draft"]
+        artifact_ids = render_graphics([
+            graphic_job(results[index]["topic"], slots[index]["content_type"], background_style, aspect_ratio, template)
+            for index in drafts
+        ])
+        for index, artifact_id in zip(drafts, artifact_ids):
+            if artifact_id:
+                image = ImageHandle(path=artifact_store.path(artifact_id), artifact_id=artifact_id)
+                results[index]["image_path"] = _save_image(image, images_dir, image_name(index, slots[index]))
+
+    entries = sorted(results.values(), key=lambda entry: entry["date"])
+    calendar_path = os.path.join(output_dir, "calendar.jsonl")
+    fd, temp_path = tempfile.mkstemp(dir=output_dir, suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        for entry in entries:
+            f.write(json.dumps(entry) + "\n")
+    os.replace(temp_path, calendar_path)
+    return entries, calendar_path
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a content calendar of posts")
+    parser.add_argument("--count", type=int, help="Number of posts (one per day from --start)")
+    parser.add_argument("--start", type=datetime.date.fromisoformat, help="First date, YYYY-MM-DD (default tomorrow)")
+    parser.add_argument("--end", type=datetime.date.fromisoformat, help="Last date, YYYY-MM-DD (instead of --count)")
+    parser.add_argument("--mix", type=parse_mix, default={"educational": 1},
+                        help="Content type weights, e.g. educational=2,inspirational=1,funny=1")
+    parser.add_argument("--hashtags", type=int, default=5)
+    parser.add_argument("--no-images", action="store_true")
+    parser.add_argument("--text-graphics", action="store_true", help="Use branded text graphics instead of generated images")
+    parser.add_argument("--background", choices=list(BACKGROUND_STYLES), help="Text graphic background (default depends on content type)")
+    parser.add_argument("--template", choices=list(TEMPLATES), default="classic", help="Text graphic layout")
+    parser.add_argument("--aspect", choices=list(ASPECT_RATIOS), default="1:1", help="Image aspect ratio")
+    parser.add_argument("--quality", choices=["low", "medium", "high"], default="medium")
+    parser.add_argument("--workers", type=int, default=BATCH_WORKERS)
+    parser.add_argument("--allow-duplicates", action="store_true", help="Keep captions that are near-duplicates of earlier ones")
+    parser.add_argument("--out", help="Output directory (default DATA_DIR/calendars/<timestamp>)")
+    args = parser.parse_args()
+
+    if args.count is None and args.end is None:
+        parser.error("give --count or --end")
+
+    slots = plan_calendar(args.count, args.start, args.end, args.mix)
+    entries, path = generate_calendar(
+        slots,
+        output_dir=args.out,
+        hashtags=args.hashtags,
+        make_images=not args.no_images,
+        use_text_graphic=args.text_graphics,
+        background_style=args.background,
+        aspect_ratio=args.aspect,
+        template=args.template,
+        quality=args.quality,
+        max_workers=args.workers,
+        avoid_duplicates=not args.allow_duplicates,
+        on_progress=lambda done, total, entry: print(f"[{done}/{total}] {entry['date']} {entry.get('topic', entry.get('error'))}")
+    )
+    print(f"Wrote {len(entries)} posts to {path}")
+
+if __name__ == "__main__":
+    main()
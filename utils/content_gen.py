@@ -5,6 +5,9 @@ Updated content_gen.py module with OpenAI 1.0+ compatibility
 from config import OPENAI_API_KEY, DEFAULT_TONE, TARGET_AUDIENCE, INSTAGRAM_USERNAME
 import random
 from openai import OpenAI
+from utils.llm_cache import cached_chat_completion, stream_chat_completion
+from utils.single_flight import openai_flights, request_key
+from utils.topic_sampler import TopicSampler
 
 # Initialize the OpenAI client
 client = OpenAI(api_key=OPENAI_API_KEY)
@@ -97,18 +100,26 @@ TOPIC_CATEGORIES = {
     ]
 }
 
-def generate_topic(content_type="educational"):
-    """Generate a compelling content topic for hypothyroid audience"""
+# Remembers which (category, topic, framework) combinations were already used
+topic_sampler = TopicSampler(TOPIC_CATEGORIES, CONTENT_FRAMEWORKS)
+
+def generate_topic(content_type="educational", fresh=False):
+    """Generate a compelling content topic for hypothyroid audience
+
+    Combinations are drawn without replacement by the topic sampler. If a
+    combination already has a title from an earlier run it is reused without
+    calling the API, unless fresh=True.
+    """
     
-    # Select a random category and topic within that category
-    category = random.choice(list(TOPIC_CATEGORIES.keys()))
-    specific_topic = random.choice(TOPIC_CATEGORIES[category])
+    # Select the next unused category, topic and content framework
+    combo = topic_sampler.draw(content_type.lower())
+    if combo["title"] and not fresh:
+        return combo["title"]
     
-    # Select a content framework based on the content type
-    framework = random.choice(CONTENT_FRAMEWORKS[content_type.lower()])
+    specific_topic = combo["topic"]
     
     # Insert the specific topic into the framework
-    topic = framework.format(topic=specific_topic)
+    topic = combo["framework"].format(topic=specific_topic)
     
     prompt = f"""
     You are a thyroid health expert who understands that many patients struggle despite "normal" lab results.
@@ -121,22 +132,30 @@ def generate_topic(content_type="educational"):
     """
 
     try:
-        response = client.chat.completions.create(
+        content = cached_chat_completion(
+            client,
             model="gpt-4o",
             messages=[
                 {"role": "system", "content": "You are a medical content specialist focused on root-cause approaches to hypothyroid issues."},
                 {"role": "user", "content": prompt}
             ],
+            fresh=fresh,
             max_tokens=50,
             temperature=0.7
         )
-        return response.choices[0].message.content.strip().strip('"')
+        title = content.strip().strip('"')
+        topic_sampler.record_title(combo, title)
+        return title
     except Exception as e:
         print(f"Error generating topic: {e}")
         return f"The Truth About {specific_topic.title()} and Your Thyroid Health"
 
-def generate_caption(topic, content_type="educational", hashtags=5):
-    """Generate a caption for an Instagram post"""
+CAPTION_MODEL = "gpt-4o"
+CAPTION_PARAMS = {"max_tokens": 750, "temperature": 0.7}
+MIN_CAPTION_LENGTH = 100  # Shorter captions are replaced with the fallback
+
+def build_caption_messages(topic, content_type="educational", hashtags=5):
+    """Build the chat messages for a caption prompt"""
     
     # Select a random messaging theme to incorporate
     theme = random.choice(MESSAGING_THEMES)
@@ -162,23 +181,34 @@ def generate_caption(topic, content_type="educational", hashtags=5):
     Make it substantive, specific, and helpful - avoid generic advice.
     """
 
+    return [
+        {"role": "system", "content": "You are a social media content creator who specializes in functional medicine approaches to thyroid health. You focus on empowering patients to look beyond labs and medication to find true healing."},
+        {"role": "user", "content": prompt}
+    ]
+
+def generate_caption(topic, content_type="educational", hashtags=5, fresh=False):
+    """Generate a caption for an Instagram post
+
+    Identical prompts are served from the completion cache unless fresh=True.
+    Concurrent requests for the same topic, type, hashtags and freshness share
+    one call, even though each would pick its own messaging theme.
+    """
     try:
         print(f"Sending caption prompt to GPT-4o...")
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {"role": "system", "content": "You are a social media content creator who specializes in functional medicine approaches to thyroid health. You focus on empowering patients to look beyond labs and medication to find true healing."},
-                {"role": "user", "content": prompt}
-            ],
-            max_tokens=750,
-            temperature=0.7
-        )
-        
-        caption = response.choices[0].message.content.strip()
+        caption = openai_flights.do(
+            "caption",
+            request_key(topic, content_type, hashtags, fresh),
+            cached_chat_completion,
+            client,
+            model=CAPTION_MODEL,
+            messages=build_caption_messages(topic, content_type, hashtags),
+            fresh=fresh,
+            **CAPTION_PARAMS
+        ).strip()
         print(f"Caption generated successfully, length: {len(caption)} characters")
         
         # Ensure we actually got a substantial caption
-        if len(caption) < 100:
+        if len(caption) < MIN_CAPTION_LENGTH:
             print("Caption too short, using fallback")
             return generate_fallback_caption(topic, content_type, hashtags)
             
@@ -187,6 +217,56 @@ def generate_caption(topic, content_type="educational", hashtags=5):
         print(f"Error generating caption: {e}")
         return generate_fallback_caption(topic, content_type, hashtags)
 
+class CaptionStream:
+    """Streams a caption from GPT-4o chunk by chunk
+
+    Iterate it (e.g. with st.write_stream) to receive text as it arrives.
+    Afterwards `text` holds the final caption. If the stream fails or ends
+    shorter than MIN_CAPTION_LENGTH, `text` is the fallback caption and
+    `used_fallback` is True, so the caller should replace what it rendered.
+    """
+
+    def __init__(self, topic, content_type="educational", hashtags=5, fresh=False):
+        self.topic = topic
+        self.content_type = content_type
+        self.hashtags = hashtags
+        self.fresh = fresh
+        self.text = None
+        self.used_fallback = False
+
+    def __iter__(self):
+        chunks = []
+        try:
+            print("Streaming caption from GPT-4o...")
+            # Shares the request with any caption for the same inputs already being written
+            for chunk in openai_flights.stream(
+                "caption",
+                request_key(self.topic, self.content_type, self.hashtags, self.fresh),
+                lambda: stream_chat_completion(
+                    client,
+                    model=CAPTION_MODEL,
+                    messages=build_caption_messages(self.topic, self.content_type, self.hashtags),
+                    fresh=self.fresh,
+                    **CAPTION_PARAMS
+                )
+            ):
+                chunks.append(chunk)
+                yield chunk
+        except Exception as e:
+            print(f"Error streaming caption: {e}")
+
+        caption = "".join(chunks).strip()
+        if len(caption) < MIN_CAPTION_LENGTH:
+            print("Caption stream too short or failed, using fallback")
+            self.text = generate_fallback_caption(self.topic, self.content_type, self.hashtags)
+            self.used_fallback = True
+        else:
+            self.text = caption
+
+def stream_caption(topic, content_type="educational", hashtags=5, fresh=False):
+    """Return a CaptionStream for incremental rendering of a new caption"""
+    return CaptionStream(topic, content_type, hashtags, fresh)
+
 def generate_fallback_caption(topic, content_type="educational", hashtags=5):
     """Generate a fallback caption if the API call fails"""
     if content_type.lower() == "educational":
@@ -0,0 +1,83 @@
+"""
+Font registry for text graphics: finds font files once and reuses loaded fonts and text measurements
+"""
+
+import os
+import sys
+import threading
+from functools import lru_cache
+from PIL import ImageFont
+
+BUNDLED_FONT_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "assets", "fonts")
+
+SYSTEM_FONT_DIRS = {
+    "darwin": ["/System/Library/Fonts", "/System/Library/Fonts/Supplemental", "/Library/Fonts",
+               os.path.expanduser("~/Library/Fonts")],
+    "win32": [os.path.join(os.environ.get("WINDIR", "C:\\Windows"), "Fonts")],
+}.get(sys.platform, ["/usr/share/fonts", "/usr/local/share/fonts", os.path.expanduser("~/.fonts")])
+
+# Preferred files per (family, weight), first match wins; the bundled DejaVu files are always there
+FONT_FAMILIES = {
+    ("sans", "regular"): ["Arial.ttf", "arial.ttf", "LiberationSans-Regular.ttf", "DejaVuSans.ttf"],
+    ("sans", "bold"): ["Arial Bold.ttf", "arialbd.ttf", "LiberationSans-Bold.ttf", "DejaVuSans-Bold.ttf"],
+}
+
+class FontRegistry:
+    """Resolves (family, weight) to a font file and memoizes FreeTypeFont objects by size
+
+    Directories are scanned once, bundled fonts first, so a file chosen on
+    one machine looks the same everywhere unless a preferred system font such
+    as Arial exists. Fonts and text measurements are cached, so a batch of
+    graphics parses each font file once.
+    """
+
+    def __init__(self, search_dirs=None, families=None):
+        self.search_dirs = search_dirs or [BUNDLED_FONT_DIR] + SYSTEM_FONT_DIRS
+        self.families = families or FONT_FAMILIES
+        self._index = None
+        self._lock = threading.Lock()
+        # Per-instance caches keyed by the call arguments
+        self.get = lru_cache(maxsize=64)(self._load)
+        self.text_length = lru_cache(maxsize=4096)(self._text_length)
+        self.text_bbox = lru_cache(maxsize=4096)(self._text_bbox)
+
+    def _scan(self):
+        index = {}
+        for directory in self.search_dirs:
+            for root, _, files in os.walk(directory):
+                for name in files:
+                    if name.lower().endswith((".ttf", ".otf", ".ttc")):
+                        index.setdefault(name, os.path.join(root, name))
+        return index
+
+    def find(self, family="sans", weight="regular"):
+        """Return the path of the best available file for family and weight, or None"""
+        with self._lock:
+            if self._index is None:
+                self._index = self._scan()
+        for name in self.families.get((family, weight), []):
+            if name in self._index:
+                return self._index[name]
+        return None
+
+    def _load(self, family="sans", size=32, weight="regular"):
+        path = self.find(family, weight)
+        if path:
+            try:
+                return ImageFont.truetype(path, size)
+            except OSError as e:
+                print(f"Error loading font {path}: {e}")
+        # Pillow's built-in font still scales, unlike the old bitmap default
+        return ImageFont.load_default(size)
+
+    def _text_length(self, text, family="sans", size=32, weight="regular"):
+        return self.get(family, size, weight).getlength(text)
+
+    def _text_bbox(self, text, family="sans", size=32, weight="regular"):
+        return self.get(family, size, weight).getbbox(text)
+
+font_registry = FontRegistry()
+
+def get_font(size, weight="regular", family="sans"):
+    """Return a cached font; get_font(60, "bold") replaces ImageFont.truetype("Arial Bold.ttf", 60)"""
+    return font_registry.get(family, size, weight)
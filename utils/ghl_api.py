@@ -1,6 +1,9 @@
-import requests
-import json
-from config import GHL_API_KEY, GHL_BASE_URL, LOCATION_ID
+import httpx
+import threading
+from config import GHL_API_KEY, GHL_MAX_CONCURRENCY, GHL_ACCOUNTS_TTL, GHL_ACCOUNTS_ERROR_TTL
+from utils.ghl_async import AsyncGHLClient, EventLoopThread
+from utils.rate_limit import request_stats
+from utils.ttl_cache import TTLCache
 
 def get_headers():
     """Return headers for GoHighLevel API requests"""
@@ -9,63 +12,135 @@ def get_headers():
         "Content-Type": "application/json"
     }
 
+class GHLClient:
+    """Blocking GoHighLevel API client that drives an AsyncGHLClient
+
+    The async client and its keep-alive connection pool live on a private
+    event loop thread, so every call reuses the same pooled connections.
+    """
+
+    def __init__(self, **kwargs):
+        self.loop = EventLoopThread()
+        self.async_client = AsyncGHLClient(**kwargs)
+
+    def get_social_accounts(self):
+        return self.loop.run(self.async_client.get_social_accounts())
+
+    def create_social_post(self, content, media_urls=None, scheduled_time=None, account_ids=None):
+        return self.loop.run(self.async_client.create_social_post(
+            content,
+            media_urls=media_urls,
+            scheduled_time=scheduled_time,
+            account_ids=account_ids
+        ))
+
+    def get_posts(self, limit=10, offset=0):
+        return self.loop.run(self.async_client.get_posts(limit=limit, offset=offset))
+
+    def iter_posts(self, page_size=20, limit=None, prefetch=True):
+        """Blocking generator over AsyncGHLClient.iter_posts; prefetching runs on the loop thread"""
+        pages = self.async_client.iter_posts(page_size=page_size, limit=limit, prefetch=prefetch)
+        try:
+            while True:
+                try:
+                    yield self.loop.run(pages.__anext__())
+                except StopAsyncIteration:
+                    return
+        finally:
+            self.loop.run(pages.aclose())
+
+    def publish_many(self, posts, max_concurrency=GHL_MAX_CONCURRENCY, split_accounts=True):
+        return self.loop.run(self.async_client.publish_many(
+            posts,
+            max_concurrency=max_concurrency,
+            split_accounts=split_accounts
+        ))
+
+    def close(self):
+        self.loop.run(self.async_client.aclose())
+        self.loop.stop()
+
+_client = None
+_client_lock = threading.Lock()
+
+def get_client():
+    """Return the process-wide GoHighLevel client, creating it on first use"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = GHLClient()
+    return _client
+
 def get_social_accounts():
     """Get all connected social media accounts"""
-    endpoint = f"{GHL_BASE_URL}social-media-posting/{LOCATION_ID}/accounts"
-    
     try:
-        response = requests.get(endpoint, headers=get_headers())
-        response.raise_for_status()
-        return response.json()
-    except requests.exceptions.RequestException as e:
+        return get_client().get_social_accounts()
+    except httpx.HTTPError as e:
         print(f"Error fetching social accounts: {e}")
         # Fallback to empty data if API fails
         return {"data": []}
 
+# Shared by every Streamlit session in this process
+_accounts_cache = TTLCache(GHL_ACCOUNTS_TTL, error_ttl=GHL_ACCOUNTS_ERROR_TTL)
+
+def _load_social_accounts():
+    return get_client().get_social_accounts()
+
+def get_cached_social_accounts():
+    """Get connected social media accounts from the process-wide cache
+
+    Accounts older than GHL_ACCOUNTS_TTL are returned immediately and
+    refreshed in the background; only the very first call waits for the API.
+    While GoHighLevel is unreachable, a failed fetch is reused for
+    GHL_ACCOUNTS_ERROR_TTL, so reruns get the empty fallback without waiting.
+    """
+    try:
+        return _accounts_cache.get("social_accounts", _load_social_accounts)
+    except httpx.HTTPError as e:
+        print(f"Error fetching social accounts: {e}")
+        return {"data": []}
+
+def warm_social_accounts():
+    """Start fetching social accounts in the background if they are not cached yet"""
+    _accounts_cache.warm("social_accounts", _load_social_accounts)
+
+def invalidate_social_accounts():
+    """Forget cached social accounts so the next read fetches them again"""
+    _accounts_cache.invalidate("social_accounts")
+
 def create_social_post(content, media_urls=None, scheduled_time=None, account_ids=None):
     """Create a social media post"""
-    endpoint = f"{GHL_BASE_URL}social-media-posting/{LOCATION_ID}/posts"
-    
-    data = {
-        "content": content,
-        "mediaUrls": media_urls or [],
-    }
-    
-    if account_ids:
-        data["accounts"] = account_ids
-    
-    if scheduled_time:
-        data["scheduledTime"] = scheduled_time
-    
     try:
-        response = requests.post(
-            endpoint, 
-            headers=get_headers(),
-            json=data
+        return get_client().create_social_post(
+            content,
+            media_urls=media_urls,
+            scheduled_time=scheduled_time,
+            account_ids=account_ids
         )
-        response.raise_for_status()
-        return response.json()
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         print(f"Error creating social post: {e}")
         return None
 
-def get_posts(limit=10):
+def publish_many(posts, max_concurrency=GHL_MAX_CONCURRENCY, split_accounts=True):
+    """Publish several posts concurrently and return one result per post and account"""
+    return get_client().publish_many(posts, max_concurrency=max_concurrency, split_accounts=split_accounts)
+
+def get_posts(limit=10, offset=0):
     """Get list of posts"""
-    endpoint = f"{GHL_BASE_URL}social-media-posting/{LOCATION_ID}/posts/list"
-    
-    data = {
-        "limit": limit,
-        "offset": 0
-    }
-    
     try:
-        response = requests.post(
-            endpoint, 
-            headers=get_headers(),
-            json=data
-        )
-        response.raise_for_status()
-        return response.json()
-    except requests.exceptions.RequestException as e:
+        return get_client().get_posts(limit=limit, offset=offset)
+    except httpx.HTTPError as e:
         print(f"Error fetching posts: {e}")
-        return {"data": []}
\ No newline at end of file
+        return {"data": []}
+
+def iter_posts(page_size=20, limit=None, prefetch=True):
+    """Iterate over post history page by page, stopping quietly if the API fails"""
+    try:
+        yield from get_client().iter_posts(page_size=page_size, limit=limit, prefetch=prefetch)
+    except httpx.HTTPError as e:
+        print(f"Error fetching posts: {e}")
+
+def get_request_stats():
+    """Return counters for GHL requests sent, rate limited, throttled, retried and failed"""
+    return request_stats.snapshot()
@@ -0,0 +1,289 @@
+"""
+Asyncio GoHighLevel client with concurrent multi-account publishing
+"""
+
+import asyncio
+import mimetypes
+import threading
+import httpx
+from config import (
+    GHL_API_KEY,
+    GHL_BASE_URL,
+    LOCATION_ID,
+    MEDIA_UPLOAD_URL,
+    GHL_POOL_SIZE,
+    GHL_CONNECT_TIMEOUT,
+    GHL_READ_TIMEOUT,
+    GHL_MAX_CONCURRENCY,
+    GHL_MAX_RETRIES,
+    GHL_BACKOFF_BASE,
+    GHL_BACKOFF_MAX
+)
+from utils.media import ImageHandle, content_hash, get_media_cache, is_hosted_url, media_payload
+from utils.rate_limit import (
+    RETRY_STATUSES,
+    UNSAFE_RETRY_STATUSES,
+    backoff_delay,
+    get_rate_limiter,
+    parse_retry_after,
+    request_stats
+)
+
+# Transport errors raised before the request reached the server, so even a POST can be resent
+UNSENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+# Appended to errors after which a created post can't be ruled out
+MAYBE_CREATED = " (the post may have been created; check GoHighLevel before retrying)"
+
+class AsyncGHLClient:
+    """Async GoHighLevel API client backed by a pooled httpx.AsyncClient"""
+
+    def __init__(self, api_key=GHL_API_KEY, base_url=GHL_BASE_URL, location_id=LOCATION_ID,
+                 pool_size=GHL_POOL_SIZE, timeout=(GHL_CONNECT_TIMEOUT, GHL_READ_TIMEOUT),
+                 limiter=None, stats=None, max_retries=GHL_MAX_RETRIES,
+                 media_upload_url=MEDIA_UPLOAD_URL, media_cache=None):
+        self.base_url = base_url
+        self.location_id = location_id
+        self.media_upload_url = media_upload_url
+        self.media_cache = media_cache or get_media_cache()
+        self._uploads = {}  # content hash -> in-flight upload task
+        self.limiter = limiter or get_rate_limiter()
+        self.stats = stats or request_stats
+        self.max_retries = max_retries
+        connect_timeout, read_timeout = timeout
+        # httpx sets Content-Type per request (JSON bodies or multipart uploads)
+        self.client = httpx.AsyncClient(
+            headers={"Authorization": f"Bearer {api_key}"},
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout)
+        )
+
+    def endpoint(self, path):
+        """Build the full URL for a location-scoped endpoint"""
+        return f"{self.base_url}social-media-posting/{self.location_id}/{path}"
+
+    async def request(self, method, path, url=None, idempotent=True, **kwargs):
+        """Send a rate-limited request, retrying 429/5xx and transport errors
+
+        path names the endpoint budget and, unless url is given, the
+        location-scoped endpoint. Retries use jittered exponential backoff and
+        honour Retry-After. A 429 pauses the endpoint's bucket so concurrent
+        callers back off too. With idempotent=False only 429, 503 and errors
+        before the request was sent are retried, since anything else may have
+        already taken effect. A body that is not JSON raises httpx.DecodingError.
+        """
+        retry_statuses = RETRY_STATUSES if idempotent else UNSAFE_RETRY_STATUSES
+        retry_errors = httpx.TransportError if idempotent else UNSENT_ERRORS
+        attempt = 0
+        while True:
+            wait = self.limiter.reserve(path)
+            if wait > 0:
+                self.stats.incr("rate_limited")
+                await asyncio.sleep(wait)
+
+            self.stats.incr("requests")
+            response = None
+            retry_after = None
+            try:
+                response = await self.client.request(method, url or self.endpoint(path), **kwargs)
+            except httpx.TransportError as e:
+                if not isinstance(e, retry_errors) or attempt >= self.max_retries:
+                    self.stats.incr("failed")
+                    raise
+            else:
+                if response.status_code == 429:
+                    self.stats.incr("throttled")
+                if response.status_code not in retry_statuses or attempt >= self.max_retries:
+                    if response.is_error:
+                        self.stats.incr("failed")
+                    response.raise_for_status()
+                    try:
+                        return response.json()
+                    except ValueError as e:
+                        self.stats.incr("failed")
+                        raise httpx.DecodingError(f"Invalid JSON from {path}: {e}", request=response.request)
+                retry_after = parse_retry_after(response.headers.get("Retry-After"))
+
+            self.stats.incr("retried")
+            delay = backoff_delay(attempt, GHL_BACKOFF_BASE, GHL_BACKOFF_MAX, retry_after)
+            if response is not None and response.status_code == 429:
+                # The limiter wait at the top of the loop covers the pause
+                self.limiter.pause(path, delay)
+            else:
+                await asyncio.sleep(delay)
+            attempt += 1
+
+    async def get_social_accounts(self):
+        return await self.request("GET", "accounts")
+
+    async def upload_media(self, data, mime_type, filename):
+        """Upload raw media bytes and return the hosted URL"""
+        files = {"file": (filename, data, mime_type)}
+        response = await self.request("POST", "media", url=self.media_upload_url, files=files)
+        return response["url"]
+
+    async def hosted_media_url(self, media):
+        """Return a hosted URL for an image handle, data: URL or local file, uploading each distinct image only once
+
+        Only http(s) URLs are passed through; a missing file raises FileNotFoundError.
+        """
+        payload = media_payload(media)
+        if payload is None:
+            url = media.url if isinstance(media, ImageHandle) else media
+            if not is_hosted_url(url):
+                raise ValueError(f"Not a hosted media URL: {url}")
+            return url
+
+        data, mime_type = payload
+        digest = content_hash(data)
+        url = self.media_cache.get(self.media_upload_url, digest)
+        if url:
+            return url
+
+        # Share one upload between concurrent posts of the same image
+        upload = self._uploads.get(digest)
+        if upload is None:
+            extension = mimetypes.guess_extension(mime_type) or ".bin"
+            upload = asyncio.ensure_future(self.upload_media(data, mime_type, digest[:16] + extension))
+            self._uploads[digest] = upload
+            try:
+                url = await upload
+                self.media_cache.put(self.media_upload_url, digest, url, len(data))
+            finally:
+                del self._uploads[digest]
+            return url
+        return await upload
+
+    async def create_social_post(self, content, media_urls=None, scheduled_time=None, account_ids=None):
+        # Posts carry hosted URLs, never multi-megabyte inline images
+        media_urls = [await self.hosted_media_url(media) for media in media_urls or []]
+        data = {
+            "content": content,
+            "mediaUrls": media_urls,
+        }
+
+        if account_ids:
+            data["accounts"] = account_ids
+
+        if scheduled_time:
+            data["scheduledTime"] = scheduled_time
+
+        # Not idempotent: a retried timeout could publish the post twice
+        return await self.request("POST", "posts", json=data, idempotent=False)
+
+    async def get_posts(self, limit=10, offset=0):
+        data = {
+            "limit": limit,
+            "offset": offset
+        }
+        return await self.request("POST", "posts/list", json=data)
+
+    async def iter_posts(self, page_size=20, limit=None, prefetch=True):
+        """Yield posts one at a time, fetching pages of page_size lazily
+
+        With prefetch, the request for the next page is started as soon as a
+        page arrives, so it downloads while the caller consumes the current
+        one. Stopping early (break / aclose) cancels any pending request.
+        """
+        offset = 0
+        remaining = limit
+        pending = None
+        try:
+            while remaining is None or remaining > 0:
+                if pending is None:
+                    page = await self.get_posts(limit=page_size, offset=offset)
+                else:
+                    page = await pending
+                    pending = None
+
+                items = page.get("data") or page.get("posts") or []
+                offset += page_size
+                last_page = len(items) < page_size or (remaining is not None and remaining <= len(items))
+                if prefetch and not last_page:
+                    pending = asyncio.ensure_future(self.get_posts(limit=page_size, offset=offset))
+
+                for item in items[:remaining]:
+                    yield item
+                if remaining is not None:
+                    remaining -= min(len(items), remaining)
+                if last_page:
+                    return
+        finally:
+            if pending is not None:
+                pending.cancel()
+
+    async def publish_many(self, posts, max_concurrency=GHL_MAX_CONCURRENCY, split_accounts=True):
+        """Publish several posts at once, at most max_concurrency requests in flight
+
+        Each post is a dict of create_social_post keyword arguments. With
+        split_accounts, a post is sent once per account so every account gets
+        its own result. Returns one result dict per request in input order:
+        {"post": index, "account_ids", "ok", "response", "error", "status", "retryable"}.
+        Only failures where the post surely wasn't created (429, 503 or an
+        unsent request) are retryable; a read timeout or a 5xx may have
+        published it already, and media that can't be sent (a missing file)
+        won't get better.
+        """
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def publish_one(index, post, account_ids):
+            async with semaphore:
+                result = {"post": index, "account_ids": account_ids, "ok": False, "response": None, "error": None,
+                          "status": None, "retryable": True}
+                try:
+                    result["response"] = await self.create_social_post(
+                        post.get("content", ""),
+                        media_urls=post.get("media_urls"),
+                        scheduled_time=post.get("scheduled_time"),
+                        account_ids=account_ids
+                    )
+                    result["ok"] = True
+                except httpx.HTTPStatusError as e:
+                    result["error"] = str(e)
+                    result["status"] = e.response.status_code
+                    result["retryable"] = e.response.status_code in UNSAFE_RETRY_STATUSES
+                    if e.response.status_code >= 500 and not result["retryable"]:
+                        result["error"] += MAYBE_CREATED
+                except UNSENT_ERRORS as e:
+                    result["error"] = str(e)
+                except httpx.HTTPError as e:
+                    result["error"] = (str(e) or type(e).__name__) + MAYBE_CREATED
+                    result["retryable"] = False
+                except (OSError, ValueError) as e:
+                    result["error"] = str(e)
+                    result["retryable"] = False
+                return result
+
+        tasks = []
+        for index, post in enumerate(posts):
+            account_ids = post.get("account_ids") or []
+            if split_accounts and len(account_ids) > 1:
+                tasks.extend(publish_one(index, post, [account_id]) for account_id in account_ids)
+            else:
+                tasks.append(publish_one(index, post, account_ids))
+
+        return list(await asyncio.gather(*tasks))
+
+    async def aclose(self):
+        await self.client.aclose()
+
+class EventLoopThread:
+    """Runs an asyncio event loop in a daemon thread so sync code can await coroutines
+
+    Keeping one long-lived loop lets the httpx connection pool survive between
+    calls, which asyncio.run() would tear down every time.
+    """
+
+    def __init__(self, name="ghl-event-loop"):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name=name, daemon=True)
+        self.thread.start()
+
+    def run(self, coro, timeout=None):
+        """Run a coroutine on the loop and block until it returns"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result(timeout)
+
+    def stop(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
@@ -0,0 +1,86 @@
+"""
+In-process background job runner, so slow image generations survive Streamlit reruns
+
+A script run submits a job, keeps its id in session state and returns at
+once; later runs poll the id. Jobs run on a thread pool shared by every
+session, and finished ones are kept until collected or pushed out by newer ones.
+"""
+
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+# Job states: queued -> running -> done or failed
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+class JobRunner:
+    """Thread pool that runs callables as jobs and keeps their status and results by job id
+
+    get() returns a snapshot dict (id, label, meta, status, result, error,
+    created_at, started_at, finished_at). At most keep_finished finished jobs
+    are retained; the oldest are dropped first.
+    """
+
+    def __init__(self, max_workers=2, keep_finished=200, name="jobs"):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._jobs = {}  # job id -> record, in submission order
+        self._lock = threading.Lock()
+        self.keep_finished = keep_finished
+
+    def submit(self, fn, *args, label="", meta=None, **kwargs):
+        """Queue fn(*args, **kwargs) and return its job id; meta is stored with the job for the caller"""
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._jobs[job_id] = {
+                "id": job_id, "label": label, "meta": meta or {}, "status": QUEUED, "result": None,
+                "error": None, "created_at": time.time(), "started_at": None, "finished_at": None
+            }
+        self._executor.submit(self._run, job_id, fn, args, kwargs)
+        return job_id
+
+    def _run(self, job_id, fn, args, kwargs):
+        self._update(job_id, status=RUNNING, started_at=time.time())
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as e:
+            print(f"Error in background job {job_id}: {e}")
+            self._update(job_id, status=FAILED, error=str(e), finished_at=time.time())
+        else:
+            self._update(job_id, status=DONE, result=result, finished_at=time.time())
+        self._prune()
+
+    def _update(self, job_id, **fields):
+        with self._lock:
+            if job_id in self._jobs:
+                self._jobs[job_id].update(fields)
+
+    def _prune(self):
+        with self._lock:
+            finished = [job_id for job_id, job in self._jobs.items() if job["status"] in (DONE, FAILED)]
+            for job_id in finished[:max(0, len(finished) - self.keep_finished)]:
+                del self._jobs[job_id]
+
+    def get(self, job_id):
+        """Return a snapshot of the job, or None if it is unknown or was pruned"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def get_many(self, job_ids):
+        """Snapshots of the known jobs among job_ids, in the given order"""
+        return [job for job in map(self.get, job_ids) if job]
+
+    def pending(self, job_ids):
+        """True while any of job_ids is still queued or running"""
+        return any(job["status"] in (QUEUED, RUNNING) for job in self.get_many(job_ids))
+
+    def forget(self, job_id):
+        """Drop a finished job once its result has been collected"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job and job["status"] in (DONE, FAILED):
+                del self._jobs[job_id]
+
+    def shutdown(self, wait=False):
+        self._executor.shutdown(wait=wait, cancel_futures=True)
@@ -0,0 +1,264 @@
+"""
+Persistent content library: every generated post, shared by all sessions and kept across restarts
+
+Items live in SQLite under DATA_DIR with indexes on topic, status and
+created_at. The post being edited is addressed by its id, never by topic,
+since several items can share a topic. Images are stored by reference (artifact path or hosted URL plus
+metadata), never inline; an image evicted from the artifact store shows as
+missing.
+"""
+
+import datetime
+import json
+import os
+import sqlite3
+import threading
+import time
+from config import DATA_DIR
+from utils.artifacts import artifact_store
+from utils.media import ImageHandle
+from utils.outbox import summarize_status
+
+LIBRARY_PATH = os.path.join(DATA_DIR, "library.sqlite3")
+
+# Item states: draft until queued in the outbox, then whatever summarize_status reports for its jobs
+DRAFT = "draft"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS content (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    topic TEXT NOT NULL,
+    caption TEXT,
+    image_prompt TEXT,
+    image TEXT,
+    artifact_id TEXT,
+    content_type TEXT,
+    status TEXT NOT NULL DEFAULT 'draft',
+    outbox_jobs TEXT NOT NULL DEFAULT '[]',
+    scheduled_for TEXT,
+    created_at TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS content_topic ON content (topic);
+CREATE INDEX IF NOT EXISTS content_status ON content (status);
+CREATE INDEX IF NOT EXISTS content_created_at ON content (created_at);
+CREATE INDEX IF NOT EXISTS content_type_created_at ON content (content_type, created_at);
+"""
+
+# Cheap columns for list views: no caption, prompt or image
+SUMMARY_COLUMNS = "id, topic, content_type, status, outbox_jobs, scheduled_for, created_at"
+
+# Columns an item dict may change through update()
+FIELDS = ("topic", "caption", "image_prompt", "image", "content_type", "status", "outbox_jobs", "scheduled_for")
+
+def image_ref(image):
+    """JSON reference to an ImageHandle: its path or URL and metadata, not its bytes"""
+    if image is None:
+        return None
+    if image.path is None and image.url is None:
+        image = artifact_store.put_image(image)  # Bytes only in memory: store them first
+    return json.dumps({"path": image.path, "url": image.url, "mime_type": image.mime_type, "meta": image.meta},
+                      default=str)
+
+def artifact_id_of(ref):
+    """Artifact-store id in an image reference, or None for hosted or missing images"""
+    return json.loads(ref)["meta"].get("artifact_id") if ref else None
+
+def image_from_ref(ref):
+    if not ref:
+        return None
+    ref = json.loads(ref)
+    return ImageHandle(path=ref["path"], url=ref["url"], mime_type=ref["mime_type"], **ref["meta"])
+
+class ContentLibrary:
+    """SQLite store of content items, returned as dicts with an ImageHandle under "image"
+
+    Item keys: id, topic, caption, image_prompt, image, content_type, status,
+    published, outbox_jobs, scheduled, scheduled_for, created_at. Each call
+    opens its own connection, so one instance is safe to share across threads.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or LIBRARY_PATH
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._lock = threading.Lock()
+        with self._connect() as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.executescript(SCHEMA)
+            self._add_artifact_column(db)
+
+    @staticmethod
+    def _add_artifact_column(db):
+        """Give libraries created before artifact_id was a column one, filled in from their image references"""
+        if "artifact_id" not in {row["name"] for row in db.execute("PRAGMA table_info(content)")}:
+            db.execute("ALTER TABLE content ADD COLUMN artifact_id TEXT")
+            rows = db.execute("SELECT id, image FROM content WHERE image IS NOT NULL").fetchall()
+            db.executemany(
+                "UPDATE content SET artifact_id = ? WHERE id = ?",
+                [(json.loads(row["image"])["meta"].get("artifact_id"), row["id"]) for row in rows]
+            )
+        db.execute("CREATE INDEX IF NOT EXISTS content_artifact_id ON content (artifact_id)")
+
+    def _connect(self):
+        db = sqlite3.connect(self.path, timeout=30)
+        db.row_factory = sqlite3.Row
+        return db
+
+    @staticmethod
+    def _to_item(row):
+        item = dict(row)
+        item["image"] = image_from_ref(item["image"])
+        item["outbox_jobs"] = json.loads(item["outbox_jobs"])
+        item["published"] = item["status"] == "published"
+        item["scheduled"] = item["scheduled_for"] is not None
+        del item["updated_at"], item["artifact_id"]
+        return item
+
+    @staticmethod
+    def _to_columns(fields):
+        unknown = set(fields) - set(FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown content fields: {', '.join(sorted(unknown))}")
+        columns = dict(fields)
+        if "image" in columns:
+            columns["image"] = image_ref(columns["image"])
+            columns["artifact_id"] = artifact_id_of(columns["image"])
+        if "outbox_jobs" in columns:
+            columns["outbox_jobs"] = json.dumps(sorted(set(columns["outbox_jobs"])))
+        return columns
+
+    def add(self, topic, caption="", image_prompt="", image=None, content_type=None, status=DRAFT, created_at=None):
+        """Insert an item and return its id"""
+        created_at = created_at or datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        ref = image_ref(image)
+        with self._lock, self._connect() as db:
+            cursor = db.execute(
+                "INSERT INTO content"
+                " (topic, caption, image_prompt, image, artifact_id, content_type, status, created_at, updated_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (topic, caption, image_prompt, ref, artifact_id_of(ref), content_type, status, created_at, time.time())
+            )
+            return cursor.lastrowid
+
+    def get(self, item_id):
+        with self._connect() as db:
+            row = db.execute("SELECT * FROM content WHERE id = ?", (item_id,)).fetchone()
+        return self._to_item(row) if row else None
+
+    def find_by_topic(self, topic):
+        """Items with exactly this topic, newest first"""
+        with self._connect() as db:
+            rows = db.execute("SELECT * FROM content WHERE topic = ? ORDER BY id DESC", (topic,)).fetchall()
+        return [self._to_item(row) for row in rows]
+
+    def references_artifact(self, artifact_id):
+        """True if any item's image is this artifact-store file"""
+        with self._connect() as db:
+            row = db.execute("SELECT 1 FROM content WHERE artifact_id = ? LIMIT 1", (artifact_id,)).fetchone()
+        return row is not None
+
+    def update(self, item_id, **fields):
+        """Change the given fields of one item"""
+        columns = self._to_columns(fields)
+        if not columns:
+            return
+        assignments = ", ".join(f"{name} = ?" for name in columns)
+        with self._lock, self._connect() as db:
+            db.execute(
+                f"UPDATE content SET {assignments}, updated_at = ? WHERE id = ?",
+                list(columns.values()) + [time.time(), item_id]
+            )
+
+    def add_outbox_jobs(self, item_id, job_ids, status=None, scheduled_for=None):
+        """Link outbox jobs to an item, optionally setting its status and schedule"""
+        item = self.get(item_id)
+        if item is None:
+            return
+        fields = {"outbox_jobs": item["outbox_jobs"] + list(job_ids)}
+        if status:
+            fields["status"] = status
+        if scheduled_for:
+            fields["scheduled_for"] = scheduled_for
+        self.update(item_id, **fields)
+
+    def sync_statuses(self, summaries, jobs):
+        """Refresh the status of listed items from their outbox jobs (a dict by job id), in place
+
+        Callers pass one page of summaries and fetch its jobs in one query, so
+        the cost of a rerun does not grow with the library.
+        """
+        for summary in summaries:
+            status = summarize_status([jobs[job_id] for job_id in summary["outbox_jobs"] if job_id in jobs])
+            if status and status != summary["status"]:
+                self.update(summary["id"], status=status)
+                summary["status"] = status
+                summary["published"] = status == "published"
+
+    @staticmethod
+    def _where(statuses=None, content_type=None, since=None, until=None):
+        """SQL filter for list_items, list_summaries and count; since and until are inclusive dates"""
+        clauses, params = [], []
+        if statuses:
+            clauses.append(f"status IN ({','.join('?' * len(statuses))})")
+            params.extend(statuses)
+        if content_type:
+            clauses.append("content_type = ?")
+            params.append(content_type)
+        if since:
+            clauses.append("created_at >= ?")
+            params.append(str(since))
+        if until:
+            # created_at is "YYYY-MM-DD HH:MM:SS", so the day after is an exclusive bound
+            clauses.append("created_at < ?")
+            params.append(str(until + datetime.timedelta(days=1)))
+        return (f" WHERE {' AND '.join(clauses)}" if clauses else ""), params
+
+    def _select(self, columns, limit, offset, filters):
+        where, params = self._where(**filters)
+        query = f"SELECT {columns} FROM content{where} ORDER BY created_at DESC, id DESC"
+        if limit is not None:
+            query += " LIMIT ? OFFSET ?"
+            params.extend([limit, offset])
+        with self._connect() as db:
+            return db.execute(query, params).fetchall()
+
+    def list_items(self, limit=None, offset=0, **filters):
+        """Full items newest first; filters are statuses, content_type, since and until"""
+        return [self._to_item(row) for row in self._select("*", limit, offset, filters)]
+
+    def list_summaries(self, limit=None, offset=0, **filters):
+        """Like list_items without caption, image_prompt and image, for one page of a list view"""
+        summaries = []
+        for row in self._select(SUMMARY_COLUMNS, limit, offset, filters):
+            summary = dict(row)
+            summary["outbox_jobs"] = json.loads(summary["outbox_jobs"])
+            summary["published"] = summary["status"] == "published"
+            summary["scheduled"] = summary["scheduled_for"] is not None
+            summaries.append(summary)
+        return summaries
+
+    def count(self, status=None, **filters):
+        """Number of items matching the filters (status is shorthand for statuses=[status])"""
+        if status is not None:
+            filters["statuses"] = [status]
+        where, params = self._where(**filters)
+        with self._connect() as db:
+            return db.execute(f"SELECT COUNT(*) FROM content{where}", params).fetchone()[0]
+
+    def content_types(self):
+        """Distinct content types in the library, for filters"""
+        with self._connect() as db:
+            rows = db.execute("SELECT DISTINCT content_type FROM content WHERE content_type IS NOT NULL").fetchall()
+        return sorted(row[0] for row in rows)
+
+_library = None
+_library_lock = threading.Lock()
+
+def get_content_library():
+    """Return the process-wide content library, creating it on first use"""
+    global _library
+    if _library is None:
+        with _library_lock:
+            if _library is None:
+                _library = ContentLibrary()
+    return _library
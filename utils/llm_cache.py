@@ -0,0 +1,144 @@
+"""
+Content-addressed disk cache for OpenAI chat completions
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from config import DATA_DIR, LLM_CACHE_ENABLED, LLM_CACHE_MAX_MB
+from utils.single_flight import openai_flights
+
+class CompletionCache:
+    """Stores completion texts as files named by a hash of (model, messages, params)
+
+    Files are sharded by the first two hex digits of the key and written
+    atomically. Reads refresh a file's mtime, so when the cache outgrows
+    max_bytes the least recently used entries are evicted first.
+    """
+
+    def __init__(self, directory=None, max_bytes=LLM_CACHE_MAX_MB * 1024 * 1024):
+        self.directory = directory or os.path.join(DATA_DIR, "llm_cache")
+        self.max_bytes = max_bytes
+        self._size = None  # Computed lazily on the first write
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(model, messages, params):
+        blob = json.dumps({"model": model, "messages": messages, "params": params}, sort_keys=True)
+        return hashlib.sha256(blob.encode()).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, encoding="utf-8") as f:
+                entry = json.load(f)
+            os.utime(path)  # Mark as recently used
+            return entry["content"]
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def put(self, key, content):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        data = json.dumps({"content": content}).encode()
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        old_size = os.path.getsize(path) if os.path.exists(path) else 0
+        os.replace(temp_path, path)
+
+        with self._lock:
+            if self._size is None:
+                self._size = sum(size for _, size, _ in self._entries())
+            else:
+                self._size += len(data) - old_size
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _entries(self):
+        """Yield (path, size, mtime) for every cached file"""
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith(".json"):
+                    path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    yield path, stat.st_size, stat.st_mtime
+
+    def _evict(self):
+        # Drop least recently used files until we are back to 90% of the budget
+        target = self.max_bytes * 0.9
+        entries = sorted(self._entries(), key=lambda entry: entry[2])
+        self._size = sum(size for _, size, _ in entries)
+        for path, size, _ in entries:
+            if self._size <= target:
+                break
+            try:
+                os.remove(path)
+                self._size -= size
+            except OSError:
+                pass
+
+    def clear(self):
+        with self._lock:
+            for path, _, _ in list(self._entries()):
+                os.remove(path)
+            self._size = 0
+
+completion_cache = CompletionCache()
+
+def cached_chat_completion(client, model, messages, fresh=False, **params):
+    """Return the text of a chat completion, reusing an identical earlier call when possible
+
+    fresh=True always calls the API (e.g. "Regenerate") and stores the new
+    result. The cache is skipped entirely when LLM_CACHE_ENABLED is off.
+    Identical requests already in flight share one API call.
+    """
+    key = CompletionCache.key(model, messages, params)
+    if LLM_CACHE_ENABLED and not fresh:
+        content = completion_cache.get(key)
+        if content is not None:
+            return content
+
+    def create():
+        response = client.chat.completions.create(model=model, messages=messages, **params)
+        content = response.choices[0].message.content
+        if LLM_CACHE_ENABLED and content:
+            completion_cache.put(key, content)
+        return content
+
+    return openai_flights.do("chat", key, create)
+
+def stream_chat_completion(client, model, messages, fresh=False, **params):
+    """Yield chat completion text chunks as they stream in, caching the full text once complete
+
+    A cache hit is yielded as a single chunk, as is the text of an identical
+    stream already in flight. Interrupted streams are not cached.
+    """
+    key = CompletionCache.key(model, messages, params)
+    if LLM_CACHE_ENABLED and not fresh:
+        content = completion_cache.get(key)
+        if content is not None:
+            yield content
+            return
+
+    def create():
+        chunks = []
+        for chunk in client.chat.completions.create(model=model, messages=messages, stream=True, **params):
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if delta:
+                chunks.append(delta)
+                yield delta
+
+        content = "".join(chunks)
+        if LLM_CACHE_ENABLED and content:
+            completion_cache.put(key, content)
+
+    yield from openai_flights.stream("chat", key, create)
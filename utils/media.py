@@ -0,0 +1,217 @@
+"""
+Media helpers: turn generated images into upload payloads and remember where each one is hosted
+
+Run `python -m utils.media serve` for a local stand-in storage server that
+accepts the same multipart upload as GoHighLevel's media endpoint.
+"""
+
+import argparse
+import base64
+import hashlib
+import json
+import mimetypes
+import os
+import sqlite3
+import threading
+import time
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+from config import DATA_DIR
+
+class ImageHandle:
+    """A generated image kept as raw bytes, a local file or a hosted URL
+
+    Image functions return one of these instead of a base64 data: URL, so the
+    pixels are decoded once and only encoded again at an edge that really
+    needs text (to_data_url). Bytes held in memory are never copied; a file
+    is read only when its bytes are asked for.
+    """
+
+    __slots__ = ("_data", "path", "url", "mime_type", "meta", "_dimensions")
+
+    def __init__(self, data=None, path=None, url=None, mime_type="image/png", **meta):
+        if data is None and path is None and url is None:
+            raise ValueError("An image handle needs data, a path or a URL")
+        self._data = data
+        self.path = path
+        self.url = url
+        self.mime_type = mime_type
+        self.meta = meta  # e.g. prompt, quality, placeholder=True
+        self._dimensions = None
+
+    @classmethod
+    def from_base64(cls, encoded, mime_type="image/png", **meta):
+        return cls(data=base64.b64decode(encoded), mime_type=mime_type, **meta)
+
+    @property
+    def is_hosted(self):
+        """True for a remote URL (including placeholders), which has no local bytes"""
+        return self._data is None and self.path is None
+
+    @property
+    def data(self):
+        """Raw image bytes, read from disk on demand; None for a hosted image"""
+        if self._data is not None:
+            return self._data
+        if self.path is not None:
+            with open(self.path, "rb") as f:
+                return f.read()
+        return None
+
+    @property
+    def dimensions(self):
+        """(width, height), read from the image header the first time it is asked for"""
+        if self._dimensions is None and not self.is_hosted:
+            from PIL import Image
+            source = BytesIO(self._data) if self._data is not None else self.path
+            with Image.open(source) as image:
+                self._dimensions = image.size
+        return self._dimensions
+
+    def save(self, path):
+        """Write the bytes to path and remember it, returning the path"""
+        with open(path, "wb") as f:
+            f.write(self.data)
+        self.path = path
+        return path
+
+    def to_data_url(self):
+        """Encode as a data: URL; only for consumers that can't take bytes"""
+        if self.is_hosted:
+            return self.url
+        return f"data:{self.mime_type};base64,{base64.b64encode(self.data).decode()}"
+
+    def display(self):
+        """What st.image and friends accept without re-encoding: bytes, a path or a URL"""
+        if self._data is not None:
+            return self._data
+        return self.path or self.url
+
+    def __repr__(self):
+        source = f"{len(self._data)} bytes" if self._data is not None else self.path or self.url
+        return f"ImageHandle({source}, {self.mime_type})"
+
+def is_hosted_url(media):
+    return isinstance(media, str) and media.startswith(("http://", "https://"))
+
+def media_payload(media):
+    """Return (bytes, mime type) for an image handle, data: URL or local file, or None for a hosted URL
+
+    Anything else, such as a path to a file that no longer exists, raises
+    FileNotFoundError rather than being passed on as if it were hosted.
+    """
+    if isinstance(media, ImageHandle):
+        if media.is_hosted:
+            return None
+        return media.data, media.mime_type
+
+    if media.startswith("data:"):
+        header, _, encoded = media.partition(",")
+        mime = header[len("data:"):].split(";")[0] or "application/octet-stream"
+        return base64.b64decode(encoded), mime
+
+    if os.path.isfile(media):
+        with open(media, "rb") as f:
+            data = f.read()
+        return data, mimetypes.guess_type(media)[0] or "application/octet-stream"
+
+    if is_hosted_url(media):
+        return None
+    raise FileNotFoundError(f"Media file not found: {media}")
+
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+class MediaCache:
+    """SQLite map of (upload endpoint, content hash) -> hosted URL, shared by every process using DATA_DIR
+
+    Keyed by endpoint too, so switching MEDIA_UPLOAD_URL (e.g. from the local
+    stand-in to GoHighLevel) uploads again instead of reusing the other host's URLs.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or os.path.join(DATA_DIR, "media.sqlite3")
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._lock = threading.Lock()
+        with self._connect() as db:
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS uploads ("
+                " upload_url TEXT NOT NULL, hash TEXT NOT NULL, url TEXT NOT NULL, size INTEGER, uploaded_at REAL,"
+                " PRIMARY KEY (upload_url, hash))"
+            )
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=10)
+
+    def get(self, upload_url, digest):
+        with self._lock, self._connect() as db:
+            row = db.execute(
+                "SELECT url FROM uploads WHERE upload_url = ? AND hash = ?", (upload_url, digest)
+            ).fetchone()
+        return row[0] if row else None
+
+    def put(self, upload_url, digest, url, size):
+        with self._lock, self._connect() as db:
+            db.execute(
+                "INSERT OR REPLACE INTO uploads (upload_url, hash, url, size, uploaded_at) VALUES (?, ?, ?, ?, ?)",
+                (upload_url, digest, url, size, time.time())
+            )
+
+_media_cache = None
+_media_cache_lock = threading.Lock()
+
+def get_media_cache():
+    """Return the process-wide media cache, creating it on first use"""
+    global _media_cache
+    if _media_cache is None:
+        with _media_cache_lock:
+            if _media_cache is None:
+                _media_cache = MediaCache()
+    return _media_cache
+
+class LocalStorageHandler(SimpleHTTPRequestHandler):
+    """Stores multipart uploads under their content hash and serves them back over GET"""
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length)
+        message = BytesParser(policy=HTTP).parsebytes(
+            f"Content-Type: {self.headers.get('Content-Type')}\r\n\r\n".encode() + body
+        )
+        upload = next((part for part in message.iter_parts() if part.get_filename()), None)
+        if upload is None:
+            self.send_error(400, "Expected a multipart 'file' field")
+            return
+
+        data = upload.get_payload(decode=True)
+        extension = os.path.splitext(upload.get_filename())[1] or ".bin"
+        name = content_hash(data) + extension
+        with open(os.path.join(self.directory, name), "wb") as f:
+            f.write(data)
+
+        host, port = self.server.server_address[:2]
+        reply = json.dumps({"fileId": name, "url": f"http://{host}:{port}/{name}"}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(reply)))
+        self.end_headers()
+        self.wfile.write(reply)
+
+def serve_local_storage(directory, host="127.0.0.1", port=8765):
+    """Run the stand-in storage server until interrupted"""
+    os.makedirs(directory, exist_ok=True)
+    handler = lambda *args, **kwargs: LocalStorageHandler(*args, directory=directory, **kwargs)
+    server = ThreadingHTTPServer((host, port), handler)
+    print(f"Serving media from {directory}; set MEDIA_UPLOAD_URL=http://{host}:{port}/upload")
+    server.serve_forever()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local stand-in for the media upload endpoint")
+    parser.add_argument("command", choices=["serve"])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--dir", default=os.path.join(DATA_DIR, "media"))
+    args = parser.parse_args()
+    serve_local_storage(args.dir, args.host, args.port)
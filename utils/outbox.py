@@ -0,0 +1,259 @@
+"""
+Durable SQLite outbox for social posts and the worker process that publishes them
+
+The app only enqueues; run the worker alongside it:
+
+    python -m utils.outbox work
+"""
+
+import argparse
+import hashlib
+import json
+import mimetypes
+import os
+import socket
+import sqlite3
+import time
+from config import DATA_DIR, GHL_MAX_CONCURRENCY, OUTBOX_BATCH_SIZE, OUTBOX_MAX_ATTEMPTS, OUTBOX_POLL_INTERVAL
+from utils.media import ImageHandle, content_hash, media_payload
+
+OUTBOX_PATH = os.path.join(DATA_DIR, "outbox.sqlite3")
+OUTBOX_MEDIA_DIR = os.path.join(DATA_DIR, "outbox_media")
+
+# Job states: queued -> publishing -> published, or back to queued until attempts run out -> failed
+QUEUED, PUBLISHING, PUBLISHED, FAILED = "queued", "publishing", "published", "failed"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    idempotency_key TEXT NOT NULL UNIQUE,
+    content_ref TEXT,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    response TEXT,
+    next_attempt_at REAL NOT NULL,
+    locked_until REAL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS outbox_ready ON outbox (status, next_attempt_at);
+CREATE INDEX IF NOT EXISTS outbox_content_ref ON outbox (content_ref);
+CREATE TABLE IF NOT EXISTS outbox_workers (
+    name TEXT PRIMARY KEY,
+    heartbeat_at REAL NOT NULL
+);
+"""
+
+def connect(path=OUTBOX_PATH):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    db = sqlite3.connect(path, timeout=30, isolation_level=None)
+    db.row_factory = sqlite3.Row
+    db.execute("PRAGMA journal_mode=WAL")
+    db.executescript(SCHEMA)
+    return db
+
+def _persist_media(media):
+    """Copy inline images to files so the queue stores paths, not megabytes of base64"""
+    if isinstance(media, ImageHandle):
+        # Copy even file-backed images: the artifact store may evict them before a scheduled post goes out
+        if media.is_hosted:
+            return media.url
+    elif not media.startswith("data:"):
+        return media
+    data, mime_type = media_payload(media)
+    os.makedirs(OUTBOX_MEDIA_DIR, exist_ok=True)
+    path = os.path.join(OUTBOX_MEDIA_DIR, content_hash(data) + (mimetypes.guess_extension(mime_type) or ".bin"))
+    if not os.path.exists(path):
+        with open(path, "wb") as f:
+            f.write(data)
+    return path
+
+def idempotency_key(content, media_urls, account_id, scheduled_time):
+    """Stable key for one post to one account; enqueueing the same post twice is a no-op"""
+    parts = [content, account_id or "", scheduled_time or ""] + list(media_urls)
+    return hashlib.sha256("\x1f".join(parts).encode()).hexdigest()
+
+def enqueue_post(content, media_urls=None, account_ids=None, scheduled_time=None, content_ref=None, db=None):
+    """Queue a post, one job per account, and return the job ids
+
+    A job with the same content, media, account and schedule is only queued
+    once, so double clicks and reruns return the existing job ids. Enqueueing
+    a failed job again puts it back in the queue; a published one is left
+    as it is, so check the returned jobs' status before reporting them as queued.
+    """
+    db = db or connect()
+    media_urls = [_persist_media(media) for media in media_urls or []]
+    now = time.time()
+    job_ids = []
+    for account_id in account_ids or [None]:
+        key = idempotency_key(content, media_urls, account_id, scheduled_time)
+        payload = {
+            "content": content,
+            "media_urls": media_urls,
+            "account_ids": [account_id] if account_id else [],
+            "scheduled_time": scheduled_time
+        }
+        db.execute(
+            "INSERT OR IGNORE INTO outbox"
+            " (idempotency_key, content_ref, payload, status, next_attempt_at, created_at, updated_at)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (key, content_ref, json.dumps(payload), QUEUED, now, now, now)
+        )
+        db.execute(
+            "UPDATE outbox SET status = ?, attempts = 0, last_error = NULL, next_attempt_at = ?, updated_at = ?"
+            " WHERE idempotency_key = ? AND status = ?",
+            (QUEUED, now, now, key, FAILED)
+        )
+        job_ids.append(db.execute("SELECT id FROM outbox WHERE idempotency_key = ?", (key,)).fetchone()["id"])
+    return job_ids
+
+def claim_batch(limit=OUTBOX_BATCH_SIZE, lease_seconds=300, db=None):
+    """Lease up to `limit` ready jobs to the calling worker
+
+    Jobs stuck in 'publishing' past their lease (a crashed worker) are
+    reclaimed.
+    """
+    db = db or connect()
+    now = time.time()
+    db.execute("BEGIN IMMEDIATE")
+    try:
+        rows = db.execute(
+            "SELECT * FROM outbox"
+            " WHERE (status = ? AND next_attempt_at <= ?) OR (status = ? AND locked_until < ?)"
+            " ORDER BY next_attempt_at LIMIT ?",
+            (QUEUED, now, PUBLISHING, now, limit)
+        ).fetchall()
+        db.executemany(
+            "UPDATE outbox SET status = ?, locked_until = ?, updated_at = ? WHERE id = ?",
+            [(PUBLISHING, now + lease_seconds, now, row["id"]) for row in rows]
+        )
+        db.execute("COMMIT")
+    except Exception:
+        db.execute("ROLLBACK")
+        raise
+    return [dict(row) for row in rows]
+
+def mark_published(job_id, response, db=None):
+    db = db or connect()
+    db.execute(
+        "UPDATE outbox SET status = ?, response = ?, attempts = attempts + 1, last_error = NULL,"
+        " locked_until = NULL, updated_at = ? WHERE id = ?",
+        (PUBLISHED, json.dumps(response), time.time(), job_id)
+    )
+
+def mark_failed(job_id, error, max_attempts=OUTBOX_MAX_ATTEMPTS, db=None):
+    """Record a failed attempt: requeue with backoff, or give up after max_attempts"""
+    db = db or connect()
+    attempts = db.execute("SELECT attempts FROM outbox WHERE id = ?", (job_id,)).fetchone()["attempts"] + 1
+    now = time.time()
+    status = FAILED if attempts >= max_attempts else QUEUED
+    db.execute(
+        "UPDATE outbox SET status = ?, attempts = ?, last_error = ?, next_attempt_at = ?,"
+        " locked_until = NULL, updated_at = ? WHERE id = ?",
+        (status, attempts, error, now + 30 * (2 ** (attempts - 1)), now, job_id)
+    )
+
+def retry_job(job_id, db=None):
+    """Put a failed job back in the queue for immediate publishing"""
+    db = db or connect()
+    now = time.time()
+    db.execute(
+        "UPDATE outbox SET status = ?, attempts = 0, next_attempt_at = ?, updated_at = ? WHERE id = ? AND status = ?",
+        (QUEUED, now, now, job_id, FAILED)
+    )
+
+def get_jobs(job_ids=None, content_ref=None, db=None):
+    """Return jobs by id and/or content reference, newest first"""
+    db = db or connect()
+    clauses, params = [], []
+    if job_ids is not None:
+        clauses.append(f"id IN ({','.join('?' * len(job_ids))})")
+        params.extend(job_ids)
+    if content_ref is not None:
+        clauses.append("content_ref = ?")
+        params.append(content_ref)
+    where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+    rows = db.execute(f"SELECT * FROM outbox{where} ORDER BY id DESC", params).fetchall()
+    return [dict(row) for row in rows]
+
+def summarize_status(jobs):
+    """Collapse the per-account jobs of one post into a single display status"""
+    statuses = {job["status"] for job in jobs}
+    if not statuses:
+        return None
+    if statuses == {PUBLISHED}:
+        return PUBLISHED
+    if statuses & {QUEUED, PUBLISHING}:
+        return PUBLISHING if PUBLISHING in statuses else QUEUED
+    return FAILED if statuses == {FAILED} else "partially published"
+
+def worker_alive(max_age=None, db=None):
+    """True if some worker has sent a heartbeat recently"""
+    db = db or connect()
+    max_age = max_age or OUTBOX_POLL_INTERVAL * 10
+    row = db.execute("SELECT MAX(heartbeat_at) AS latest FROM outbox_workers").fetchone()
+    return bool(row["latest"]) and time.time() - row["latest"] < max_age
+
+def sync_library_status(content_refs, db=None):
+    """Write the combined status of each referenced content library item's jobs back to the library"""
+    from utils.library import get_content_library
+
+    db = db or connect()
+    library = get_content_library()
+    for content_ref in set(content_refs):
+        if content_ref and content_ref.isdigit():  # Library item id; older jobs were keyed by topic
+            status = summarize_status(get_jobs(content_ref=content_ref, db=db))
+            if status:
+                library.update(int(content_ref), status=status)
+
+def run_worker(batch_size=OUTBOX_BATCH_SIZE, concurrency=GHL_MAX_CONCURRENCY,
+               poll_interval=OUTBOX_POLL_INTERVAL, once=False):
+    """Drain the outbox: claim a batch, publish it concurrently, record each result"""
+    from utils.ghl_api import get_client
+
+    db = connect()
+    client = get_client()
+    name = f"{socket.gethostname()}:{os.getpid()}"
+    print(f"Outbox worker {name} polling {OUTBOX_PATH}")
+
+    while True:
+        db.execute(
+            "INSERT OR REPLACE INTO outbox_workers (name, heartbeat_at) VALUES (?, ?)",
+            (name, time.time())
+        )
+        jobs = claim_batch(batch_size, db=db)
+        if jobs:
+            posts = [json.loads(job["payload"]) for job in jobs]
+            try:
+                results = client.publish_many(posts, max_concurrency=concurrency, split_accounts=False)
+            except Exception as e:
+                # e.g. a queued media file went missing; keep the worker alive
+                print(f"Error publishing batch: {e}")
+                results = [{"ok": False, "error": str(e)} for _ in jobs]
+            for job, result in zip(jobs, results):
+                if result["ok"]:
+                    mark_published(job["id"], result["response"], db=db)
+                elif result.get("retryable") is False:
+                    # Rejected, media gone, or maybe already posted: resending could only duplicate it
+                    mark_failed(job["id"], result["error"], max_attempts=1, db=db)
+                else:
+                    mark_failed(job["id"], result["error"], db=db)
+            # The app's Status filter and metrics read the library, not the outbox
+            sync_library_status([job["content_ref"] for job in jobs], db=db)
+            print(f"Published {sum(r['ok'] for r in results)}/{len(results)} queued posts")
+        elif once:
+            return
+        else:
+            time.sleep(poll_interval)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Publish queued social posts")
+    parser.add_argument("command", choices=["work"])
+    parser.add_argument("--batch-size", type=int, default=OUTBOX_BATCH_SIZE)
+    parser.add_argument("--concurrency", type=int, default=GHL_MAX_CONCURRENCY)
+    parser.add_argument("--poll-interval", type=float, default=OUTBOX_POLL_INTERVAL)
+    parser.add_argument("--once", action="store_true", help="Exit when the queue is empty")
+    args = parser.parse_args()
+    run_worker(args.batch_size, args.concurrency, args.poll_interval, args.once)
@@ -0,0 +1,177 @@
+"""
+Post generation pipeline: topic first, then caption and image at the same time
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+from config import PIPELINE_WORKERS, CAPTION_SIMILARITY_THRESHOLD
+from utils.content_gen import generate_topic, generate_caption, generate_image_prompt
+from utils.image_gen import generate_image, generate_transparent_image, create_graphic_with_text
+from utils.artifacts import artifact_store
+from utils.backgrounds import BACKGROUND_STYLES
+from utils.library import get_content_library
+from utils.similarity import get_caption_index
+from utils.single_flight import openai_flights, request_key
+
+# Shared by every session; image stages run here while the caller writes the caption
+_executor = ThreadPoolExecutor(max_workers=PIPELINE_WORKERS, thread_name_prefix="post-pipeline")
+
+# GPT Image 1 sizes closest to each text graphic aspect ratio
+PHOTO_SIZES = {"1:1": "1024x1024", "4:5": "1024x1536", "9:16": "1024x1536"}
+
+def render_image(topic, prompt, content_type, use_text_graphic=False, quality="medium", transparent_bg=False,
+                 background_style=None, aspect_ratio="1:1", template="classic"):
+    """Create the post image (generated photo or text graphic) and return its ImageHandle"""
+    if use_text_graphic:
+        # Create text-based graphic
+        return create_graphic_with_text(topic, content_type.lower(), background_style, aspect_ratio, template)
+
+    size = PHOTO_SIZES.get(aspect_ratio, "1024x1024")
+    if transparent_bg:
+        # Use transparent background option
+        return generate_transparent_image(prompt, content_type.lower(), quality=quality, size=size)
+    # Use standard image generation
+    return generate_image(prompt, content_type.lower(), quality=quality, size=size)
+
+def render_image_once(topic, prompt, content_type, use_text_graphic=False, quality="medium", transparent_bg=False,
+                      background_style=None, aspect_ratio="1:1", template="classic"):
+    """render_image for one user request; identical requests already in flight share its result
+
+    Covers double clicks and two people generating the same post. Variants
+    call render_image directly, since each must be a separate image.
+    """
+    args = (topic, prompt, content_type, use_text_graphic, quality, transparent_bg, background_style, aspect_ratio, template)
+    return openai_flights.do("image", request_key(*args), render_image, *args)
+
+def render_item_image(item_id, topic, prompt, content_type, use_text_graphic=False, quality="medium",
+                      transparent_bg=False, background_style=None, aspect_ratio="1:1", template="classic"):
+    """render_image_once, then store the image on content library item item_id and return it
+
+    Meant for background jobs: the item gets its image even if the session
+    that asked for it is gone by the time it is ready.
+    """
+    image = render_image_once(topic, prompt, content_type, use_text_graphic, quality, transparent_bg,
+                              background_style, aspect_ratio, template)
+    get_content_library().update(item_id, image=image, image_prompt=prompt)
+    return image
+
+def render_variant(index, topic, prompt, content_type, use_text_graphic=False, quality="medium", transparent_bg=False,
+                   background_style=None, aspect_ratio="1:1", template="classic"):
+    """Render candidate image number index (from 0) and return its ImageHandle
+
+    Photo variants are independent calls with the same prompt; text graphic
+    variants without a fixed background_style each get a different background.
+    The placeholder returned when the image API fails is raised as an error
+    instead, so a failed variant is skipped rather than offered.
+    """
+    styles = list(BACKGROUND_STYLES)
+    style = background_style or (styles[index % len(styles)] if use_text_graphic else None)
+    image = render_image(topic, prompt, content_type, use_text_graphic, quality, transparent_bg, style, aspect_ratio, template)
+    if image.meta.get("placeholder"):
+        raise RuntimeError(f"Image variant {index + 1} could not be generated")
+    return image
+
+def keep_variant(variants, chosen, keep=()):
+    """Delete the stored variants other than chosen (None discards them all) from the artifact store
+
+    Artifacts are content-addressed, so a variant can be the very file behind
+    a library item (text graphics are often byte-identical) or an image in
+    keep, such as the session's current image. Those are left alone.
+    """
+    kept = {image.meta.get("artifact_id") for image in (chosen, *keep) if image is not None}
+    library = get_content_library()
+    for variant in variants:
+        artifact_id = variant.meta.get("artifact_id")
+        if artifact_id and artifact_id not in kept and not library.references_artifact(artifact_id):
+            artifact_store.delete(artifact_id)
+
+def ensure_unique_caption(topic, caption, content_type="educational", hashtags=5,
+                          threshold=CAPTION_SIMILARITY_THRESHOLD, max_attempts=2):
+    """Regenerate a caption while it is a near-duplicate of an indexed one
+
+    Returns (caption, similarity, closest entry); the similarity may still be
+    over the threshold if every attempt came back too close.
+    """
+    index = get_caption_index()
+    similarity, match = index.most_similar(caption)
+    attempts = 0
+    while similarity >= threshold and attempts < max_attempts:
+        print(f"Caption is {similarity:.0%} similar to an earlier one, regenerating")
+        caption = generate_caption(topic, content_type.lower(), hashtags, fresh=True)
+        similarity, match = index.most_similar(caption)
+        attempts += 1
+    return caption, similarity, match
+
+def _timed(timings, stage, fn, *args, **kwargs):
+    start = time.perf_counter()
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        timings[stage] = time.perf_counter() - start
+
+def run_post_pipeline(content_type="educational", hashtags=5, make_image=True, use_text_graphic=False,
+                      quality="medium", transparent_bg=False, caption_stage=None, avoid_duplicates=False,
+                      background_style=None, aspect_ratio="1:1", template="classic", submit_image=None):
+    """Generate a topic, then its caption and image concurrently
+
+    The image stage runs on the shared thread pool while the caption stage
+    runs in the calling thread, so a Streamlit caller can stream the caption
+    into the page. caption_stage(topic) -> caption defaults to
+    generate_caption. A caller with its own background jobs passes
+    submit_image(topic, image_prompt) instead; its return value comes back
+    as image_job, image is None and nothing waits for the image.
+
+    With avoid_duplicates, a caption too similar to an earlier one is
+    regenerated. Every final caption is added to the caption index. Returns a
+    dict with topic, caption, caption_similarity, similar_caption,
+    image_prompt, image (an ImageHandle), image_job and timings (seconds per
+    stage plus "total"); wall-clock time is roughly topic + max(caption, image).
+    """
+    timings = {}
+    start = time.perf_counter()
+
+    topic = _timed(timings, "topic", generate_topic, content_type.lower())
+    image_prompt = _timed(timings, "image_prompt", generate_image_prompt, topic)
+
+    image_future = image_job = None
+    if make_image and submit_image:
+        image_job = submit_image(topic, image_prompt)
+    elif make_image:
+        image_future = _executor.submit(
+            _timed, timings, "image", render_image,
+            topic, image_prompt, content_type, use_text_graphic, quality, transparent_bg,
+            background_style, aspect_ratio, template
+        )
+
+    if caption_stage is None:
+        caption_stage = lambda topic: generate_caption(topic, content_type.lower(), hashtags)
+    try:
+        caption = _timed(timings, "caption", caption_stage, topic)
+        index = get_caption_index()
+        if avoid_duplicates:
+            caption, similarity, match = _timed(
+                timings, "dedupe", ensure_unique_caption, topic, caption, content_type, hashtags
+            )
+        else:
+            similarity, match = index.most_similar(caption)
+        index.add(caption, topic=topic, content_type=content_type.lower())
+    finally:
+        # Always collect the image so a failed caption doesn't orphan the job
+        image = image_future.result() if image_future else None
+
+    timings["total"] = time.perf_counter() - start
+    return {
+        "topic": topic,
+        "caption": caption,
+        "caption_similarity": similarity,
+        "similar_caption": match["text"] if match else None,
+        "image_prompt": image_prompt,
+        "image": image,
+        "image_job": image_job,
+        "timings": timings
+    }
+
+def format_timings(timings):
+    """One-line summary such as 'topic 1.2s · caption 6.0s · image 14.1s · total 15.4s'"""
+    stages = [stage for stage in ("topic", "caption", "dedupe", "image", "total") if stage in timings]
+    return " · ".join(f"{stage} {timings[stage]:.1f}s" for stage in stages)
@@ -0,0 +1,126 @@
+"""
+Token-bucket rate limiting, retry backoff and request counters for GoHighLevel calls
+"""
+
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from config import GHL_RATE_LIMIT, GHL_RATE_BURST, GHL_ENDPOINT_BUDGETS
+
+# Status codes worth retrying: throttling and transient server errors
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# For requests that must not run twice (creating a post): statuses that mean the server did nothing
+UNSAFE_RETRY_STATUSES = {429, 503}
+
+class TokenBucket:
+    """Thread-safe token bucket refilled at `rate` tokens per second up to `capacity`
+
+    reserve() takes a token immediately and returns how long the caller must
+    wait before using it, so the bucket works from any thread or event loop.
+    """
+
+    def __init__(self, rate, capacity):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        if now > self.updated:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def reserve(self, tokens=1):
+        """Take tokens and return the delay in seconds before they are valid"""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.tokens -= tokens
+            wait = max(0.0, self.updated - now)
+            if self.tokens < 0:
+                wait += -self.tokens / self.rate
+            return wait
+
+    def pause(self, seconds):
+        """Stop handing out tokens for `seconds` (e.g. after a 429)"""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.tokens = min(self.tokens, 0.0)
+            self.updated = max(self.updated, now + seconds)
+
+class RateLimiter:
+    """A location-wide token bucket plus one bucket per endpoint budget"""
+
+    def __init__(self, rate=GHL_RATE_LIMIT, burst=GHL_RATE_BURST, endpoint_budgets=None):
+        self.global_bucket = TokenBucket(rate, burst)
+        budgets = GHL_ENDPOINT_BUDGETS if endpoint_budgets is None else endpoint_budgets
+        self.endpoint_buckets = {
+            endpoint: TokenBucket(endpoint_rate, endpoint_burst)
+            for endpoint, (endpoint_rate, endpoint_burst) in budgets.items()
+        }
+
+    def reserve(self, endpoint):
+        """Reserve one request for an endpoint and return the wait in seconds"""
+        wait = self.global_bucket.reserve()
+        bucket = self.endpoint_buckets.get(endpoint)
+        if bucket is not None:
+            wait = max(wait, bucket.reserve())
+        return wait
+
+    def pause(self, endpoint, seconds):
+        """Back off an endpoint (or everything, if it has no budget of its own)"""
+        bucket = self.endpoint_buckets.get(endpoint, self.global_bucket)
+        bucket.pause(seconds)
+
+class RequestStats:
+    """Thread-safe counters for requests sent, rate limited, throttled, retried and failed"""
+
+    FIELDS = ("requests", "rate_limited", "throttled", "retried", "failed")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def incr(self, name, amount=1):
+        with self._lock:
+            self._counts[name] += amount
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self._counts)
+
+    def reset(self):
+        with self._lock:
+            self._counts = {field: 0 for field in self.FIELDS}
+
+def parse_retry_after(value):
+    """Return the Retry-After header as seconds, or None if missing or invalid"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+        return max(0.0, retry_at.timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+def backoff_delay(attempt, base, cap, retry_after=None):
+    """Exponential backoff with full jitter; a server Retry-After is used as the floor"""
+    delay = random.uniform(0, min(cap, base * (2 ** attempt)))
+    if retry_after is not None:
+        delay = max(delay, retry_after)
+    return delay
+
+_limiter = RateLimiter()
+request_stats = RequestStats()
+
+def get_rate_limiter():
+    """Return the process-wide rate limiter shared by every GHL client"""
+    return _limiter
@@ -0,0 +1,95 @@
+"""
+Render many text graphics in parallel worker processes
+
+PIL drawing and PNG encoding hold the GIL, so threads don't help; each
+worker process loads fonts and template layers once and then renders
+graphics on its own core, writing them straight into the artifact store.
+"""
+
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO
+from config import RENDER_PROCESSES
+from utils.artifacts import artifact_store
+from utils.fonts import font_registry
+from utils.media import ImageHandle
+from utils.templates import TEMPLATES, render_template
+
+def _warm_worker():
+    """Parse every font the templates use before the first job arrives"""
+    for layers in TEMPLATES.values():
+        for layer in layers:
+            if "font_size" in layer:
+                font_registry.get("sans", layer["font_size"], layer.get("weight", "regular"))
+
+def _render(job, return_bytes):
+    image = render_template(
+        job.get("template", "classic"),
+        texts={"title": job["topic"]},
+        content_type=job.get("content_type", "educational"),
+        aspect_ratio=job.get("aspect_ratio", "1:1"),
+        palette=job["palette"],
+        background_style=job.get("background_style"),
+        logo_path=job.get("logo_path")
+    )
+    buffer = BytesIO()
+    image.save(buffer, format="PNG")
+    if return_bytes:
+        return buffer.getvalue()
+    # Content-addressed, atomic writes: safe from many processes at once
+    return artifact_store.put_image(ImageHandle(data=buffer.getvalue())).meta["artifact_id"]
+
+def _render_safely(job, return_bytes):
+    try:
+        return _render(job, return_bytes)
+    except Exception as e:
+        print(f"Error rendering graphic for {job.get('topic')!r}: {e}")
+        return None
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_render_pool():
+    """Return the shared worker pool, starting it on first use
+
+    Workers are spawned rather than forked: the app process runs event loop
+    and pool threads, which a fork would copy in an unknown state.
+    """
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ProcessPoolExecutor(
+                    max_workers=RENDER_PROCESSES,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_warm_worker
+                )
+    return _pool
+
+def render_graphics(jobs, return_bytes=False, pool=None, chunksize=4):
+    """Render text graphics in the worker pool, returning one result per job in order
+
+    Each job is a dict with topic, palette and optionally content_type,
+    aspect_ratio, template, background_style and logo_path (the arguments
+    of create_graphic_with_text). Results are artifact IDs, or PNG bytes with
+    return_bytes; a job that failed gives None. If a worker dies, the pool is
+    replaced on the next call and this batch is rendered in-process.
+    """
+    shared = pool is None
+    pool = pool or get_render_pool()
+    try:
+        return list(pool.map(_render_safely, jobs, [return_bytes] * len(jobs), chunksize=chunksize))
+    except BrokenProcessPool as e:
+        print(f"Render pool failed, rendering in-process: {e}")
+        if shared:
+            shutdown_render_pool()
+        return [_render_safely(job, return_bytes) for job in jobs]
+
+def shutdown_render_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown()
+            _pool = None
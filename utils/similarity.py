@@ -0,0 +1,154 @@
+"""
+Near-duplicate caption detection with MinHash signatures held in NumPy arrays
+"""
+
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+import numpy as np
+from config import DATA_DIR, CAPTION_SIMILARITY_THRESHOLD
+
+WORD_RE = re.compile(r"[a-z0-9']+")
+TAG_RE = re.compile(r"[#@]\w+")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS captions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    signature BLOB NOT NULL,
+    entry TEXT NOT NULL
+);
+"""
+
+def shingles(text, size=3):
+    """Word n-grams of a caption, ignoring case, punctuation, hashtags and mentions"""
+    words = WORD_RE.findall(TAG_RE.sub(" ", text.lower()))
+    if len(words) < size:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+class CaptionIndex:
+    """MinHash index of every caption we generated or published
+
+    Each caption becomes a num_perm-value signature; the fraction of matching
+    values between two signatures estimates their Jaccard similarity over word
+    3-grams. Queries compare against all stored signatures in one vectorized
+    NumPy operation, which takes about a millisecond for thousands of
+    captions. Signatures are appended to DATA_DIR/caption_index.sqlite3, and
+    every query first loads rows added since the last one, so the app and a
+    batch run see each other's captions instead of overwriting them.
+    """
+
+    SEED = 20240501  # Fixed so signatures stay comparable across runs
+
+    def __init__(self, path=None, num_perm=128):
+        self.path = path or os.path.join(DATA_DIR, "caption_index.sqlite3")
+        self.num_perm = num_perm
+        rng = np.random.default_rng(self.SEED)
+        # Multiply-shift hash family: odd 64-bit multipliers, products wrap mod 2**64
+        self._a = (rng.integers(0, 2 ** 63, num_perm, dtype=np.uint64) << np.uint64(1)) | np.uint64(1)
+        self._b = rng.integers(0, 2 ** 63, num_perm, dtype=np.uint64)
+        self._lock = threading.Lock()
+        self.signatures = np.empty((0, num_perm), dtype=np.uint32)
+        self.entries = []  # Metadata per row: {"text", "created_at", ...}
+        self._last_id = 0  # Newest database row already in memory
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with self._connect() as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.executescript(SCHEMA)
+        self._import_npz(os.path.join(os.path.dirname(self.path), "caption_index.npz"))
+
+    def signature(self, text):
+        hashes = np.fromiter(
+            (zlib.crc32(shingle.encode()) for shingle in shingles(text)),
+            dtype=np.uint64
+        )
+        if hashes.size == 0:
+            return np.full(self.num_perm, np.iinfo(np.uint32).max, dtype=np.uint32)
+        permuted = (self._a[:, None] * hashes[None, :] + self._b[:, None]) >> np.uint64(32)
+        return permuted.min(axis=1).astype(np.uint32)
+
+    def query(self, text, top_k=5):
+        """Return up to top_k (similarity, entry) pairs, most similar first"""
+        signature = self.signature(text)
+        with self._lock:
+            self._refresh()
+            if not self.entries:
+                return []
+            similarities = (self.signatures == signature).mean(axis=1)
+            top = np.argsort(similarities)[::-1][:top_k]
+            return [(float(similarities[i]), self.entries[i]) for i in top]
+
+    def most_similar(self, text):
+        """Return (similarity, entry) for the closest stored caption, or (0.0, None)"""
+        matches = self.query(text, top_k=1)
+        return matches[0] if matches else (0.0, None)
+
+    def is_near_duplicate(self, text, threshold=CAPTION_SIMILARITY_THRESHOLD):
+        return self.most_similar(text)[0] >= threshold
+
+    def add(self, text, **meta):
+        """Index a caption and persist it"""
+        signature = self.signature(text)
+        entry = dict(meta, text=text, created_at=time.time())
+        with self._lock:
+            with self._connect() as db:
+                db.execute("INSERT INTO captions (signature, entry) VALUES (?, ?)",
+                           (signature.tobytes(), json.dumps(entry, default=str)))
+            self._refresh()
+        return entry
+
+    def __len__(self):
+        with self._lock:
+            self._refresh()
+            return len(self.entries)
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def _refresh(self):
+        """Load rows added since the last refresh, by this or any other process; hold self._lock"""
+        with self._connect() as db:
+            rows = db.execute(
+                "SELECT id, signature, entry FROM captions WHERE id > ? ORDER BY id", (self._last_id,)
+            ).fetchall()
+        if not rows:
+            return
+        self._last_id = rows[-1][0]
+        # Rows signed with a different num_perm can't be compared with ours
+        rows = [row for row in rows if len(row[1]) == self.num_perm * 4]
+        if rows:
+            signatures = [np.frombuffer(row[1], dtype=np.uint32) for row in rows]
+            self.signatures = np.vstack([self.signatures] + signatures)
+            self.entries.extend(json.loads(row[2]) for row in rows)
+
+    def _import_npz(self, npz_path):
+        """Move captions from the .npz file older versions kept into an empty database"""
+        if not os.path.exists(npz_path):
+            return
+        with self._connect() as db:
+            db.execute("BEGIN IMMEDIATE")  # Only one process imports
+            if db.execute("SELECT 1 FROM captions LIMIT 1").fetchone():
+                return
+            with np.load(npz_path) as data:
+                if int(data["num_perm"]) != self.num_perm:
+                    print("Caption index was built with different settings, starting a new one")
+                    return
+                rows = zip(data["signatures"], json.loads(str(data["entries"])))
+                db.executemany("INSERT INTO captions (signature, entry) VALUES (?, ?)",
+                               [(signature.astype(np.uint32).tobytes(), json.dumps(entry)) for signature, entry in rows])
+
+_caption_index = None
+_caption_index_lock = threading.Lock()
+
+def get_caption_index():
+    """Return the process-wide caption index, loading it on first use"""
+    global _caption_index
+    if _caption_index is None:
+        with _caption_index_lock:
+            if _caption_index is None:
+                _caption_index = CaptionIndex()
+    return _caption_index
@@ -0,0 +1,113 @@
+"""
+Single-flight request coalescing: concurrent identical calls share one upstream request
+"""
+
+import hashlib
+import json
+import threading
+
+def request_key(*parts):
+    """Stable hash of JSON-serialisable request inputs"""
+    blob = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha256(blob.encode()).hexdigest()
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+    def wait(self):
+        self.done.wait()
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+class SingleFlight:
+    """Runs at most one call per key at a time; callers arriving meanwhile wait for its result
+
+    Nothing is cached: once a call finishes, the next caller with the same key
+    starts a new one. A failure is raised in every caller that shared the call.
+    Keys are scoped by a request name (e.g. "caption"), and counters are kept
+    per name. Layered names (a "caption" call made of "chat" calls) count at each layer.
+    """
+
+    FIELDS = ("calls", "upstream", "coalesced", "failed")
+
+    def __init__(self):
+        self._calls = {}  # (name, key) -> _Call in flight
+        self._lock = threading.Lock()
+        self._counts = {}  # name -> {field: count}
+
+    def _incr(self, name, field):
+        self._counts.setdefault(name, dict.fromkeys(self.FIELDS, 0))[field] += 1
+
+    def join(self, name, key):
+        """Return (call, leader); the leader must run the request and then call finish()"""
+        with self._lock:
+            self._incr(name, "calls")
+            call = self._calls.get((name, key))
+            if call is not None:
+                self._incr(name, "coalesced")
+                return call, False
+            call = self._calls[(name, key)] = _Call()
+            self._incr(name, "upstream")
+            return call, True
+
+    def finish(self, name, key, call, result=None, error=None):
+        """Publish the leader's result (or error) to every waiting caller"""
+        with self._lock:
+            self._calls.pop((name, key), None)
+            if error is not None:
+                self._incr(name, "failed")
+        call.result, call.error = result, error
+        call.done.set()
+
+    def do(self, name, key, fn, *args, **kwargs):
+        """Return fn(*args, **kwargs), sharing the call with concurrent callers using the same name and key"""
+        call, leader = self.join(name, key)
+        if not leader:
+            return call.wait()
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as e:
+            self.finish(name, key, call, error=e)
+            raise
+        self.finish(name, key, call, result=result)
+        return result
+
+    def stream(self, name, key, make_chunks):
+        """Yield text chunks from make_chunks(); concurrent callers get the leader's full text as one chunk"""
+        call, leader = self.join(name, key)
+        if not leader:
+            yield call.wait()
+            return
+        chunks, error = [], None
+        try:
+            for chunk in make_chunks():
+                chunks.append(chunk)
+                yield chunk
+        except Exception as e:
+            error = e
+            raise
+        except GeneratorExit:
+            error = RuntimeError(f"{name} stream was abandoned")
+            raise
+        finally:
+            self.finish(name, key, call, result="".join(chunks), error=error)
+
+    def stats(self):
+        """Counters as {name: {calls, upstream, coalesced, failed}}; coalesced calls never reached the API"""
+        with self._lock:
+            return {name: dict(counts) for name, counts in self._counts.items()}
+
+    def reset_stats(self):
+        with self._lock:
+            self._counts = {}
+
+# Shared by content_gen and image_gen, so every OpenAI call in the process coalesces
+openai_flights = SingleFlight()
+
+def get_coalescing_stats():
+    """Return OpenAI request coalescing counters per request kind"""
+    return openai_flights.stats()
@@ -0,0 +1,189 @@
+"""
+Declarative templates for text graphics: layers, text boxes and a logo slot, rendered in memory
+
+A template is a list of layers drawn in order. Sizes are in pixels at a
+1024px-wide design and scale with the output width; vertical positions are
+fractions of the height, so one template serves every aspect ratio.
+
+    {"type": "background"}                      brand background (utils.backgrounds style)
+    {"type": "bar", "edge": "top", "size": 60}  full-width colour band
+    {"type": "logo", "size": 60, ...}           logo image if one is given, else a badge with text
+    {"type": "scatter", "count": 5, ...}        random circles, only for the listed content types
+    {"type": "text", "name": "title", ...}      wrapped, centred text box
+
+Background, bar and logo layers never change between renders of the same
+template, size, style and logo, so they are rendered once and cached.
+"""
+
+import os
+import random
+from functools import lru_cache
+from PIL import Image, ImageDraw
+from utils.backgrounds import render_background
+from utils.fonts import font_registry
+
+DESIGN_WIDTH = 1024
+
+ASPECT_RATIOS = {
+    "1:1": (1024, 1024),
+    "4:5": (1024, 1280),
+    "9:16": (1024, 1820),
+}
+
+# Background style used for each content type when none is chosen
+DEFAULT_BACKGROUNDS = {
+    "educational": "solid",
+    "inspirational": "linear",
+    "funny": "stripes",
+    "mixed": "solid",
+}
+
+STATIC_LAYERS = {"background", "bar", "logo"}
+
+TEMPLATES = {
+    # The original single layout: title centred, subtitle below, brand bars and "dr" badge
+    "classic": [
+        {"type": "background"},
+        {"type": "bar", "edge": "top", "size": 60, "color": "primary"},
+        {"type": "bar", "edge": "bottom", "size": 60, "color": "primary"},
+        {"type": "logo", "size": 60, "padding": 30, "color": "primary", "text": "dr", "font_size": 32},
+        {"type": "scatter", "count": 5, "min_size": 20, "max_size": 80, "top": 120, "bottom": 180,
+         "content_types": ["educational"]},
+        {"type": "text", "name": "title", "font_size": 60, "weight": "bold", "color": "text",
+         "line_height": 70, "margin": 50, "anchor": 0.5, "shadow": "#333333"},
+        {"type": "text", "name": "subtitle", "default": "Beyond the lab results", "font_size": 32,
+         "color": "primary", "line_height": 40, "margin": 50, "follows": "title", "gap": 30},
+    ],
+    # Headline in the upper third over a wide band, subtitle near the bottom
+    "headline": [
+        {"type": "background"},
+        {"type": "bar", "edge": "top", "size": 24, "color": "secondary"},
+        {"type": "logo", "size": 72, "padding": 40, "color": "primary", "text": "dr", "font_size": 36},
+        {"type": "text", "name": "title", "font_size": 72, "weight": "bold", "color": "text",
+         "line_height": 84, "margin": 80, "anchor": 0.35},
+        {"type": "text", "name": "subtitle", "default": "Beyond the lab results", "font_size": 36,
+         "color": "primary", "line_height": 44, "margin": 80, "anchor": 0.8},
+    ],
+}
+
+def break_lines(text, max_width, font_size, weight="regular"):
+    """Greedy word wrap in one pass: each distinct word is measured once, widths are summed
+
+    Re-measuring every growing prefix, as the old loop did, is quadratic in
+    the length of the text; this is linear, and measurements are cached
+    across renders by the font registry.
+    """
+    space = font_registry.text_length(" ", "sans", font_size, weight)
+    lines, current, current_width = [], [], 0.0
+    for word in text.split():
+        word_width = font_registry.text_length(word, "sans", font_size, weight)
+        candidate = word_width if not current else current_width + space + word_width
+        if current and candidate >= max_width:
+            lines.append(" ".join(current))
+            current, current_width = [word], word_width
+        else:
+            current.append(word)
+            current_width = candidate
+    if current:
+        lines.append(" ".join(current))
+    return lines
+
+def _logo_mtime(logo_path):
+    try:
+        return os.path.getmtime(logo_path) if logo_path else None
+    except OSError:
+        return None
+
+@lru_cache(maxsize=32)
+def _static_layers(template, width, height, style, palette, logo_path, logo_mtime):
+    """Render a template's background, bars and logo once per (size, style, colours, logo)"""
+    colors = dict(palette)
+    scale = width / DESIGN_WIDTH
+    image = render_background(style, width, height, colors["primary"], colors["secondary"], colors["background"])
+    draw = ImageDraw.Draw(image)
+
+    for layer in TEMPLATES[template]:
+        if layer["type"] == "bar":
+            size = round(layer["size"] * scale)
+            box = [(0, 0), (width, size)] if layer["edge"] == "top" else [(0, height - size), (width, height)]
+            draw.rectangle(box, fill=colors[layer["color"]])
+
+        elif layer["type"] == "logo":
+            size = round(layer["size"] * scale)
+            padding = round(layer["padding"] * scale)
+            box = (width - size - padding, height - size - padding, width - padding, height - padding)
+            logo = None
+            if logo_path:
+                try:
+                    with Image.open(logo_path) as source:
+                        logo = source.convert("RGBA")
+                except OSError as e:
+                    print(f"Error loading logo {logo_path}: {e}")
+            if logo is not None:
+                logo.thumbnail((size, size), Image.LANCZOS)
+                image.paste(logo, (box[2] - logo.width, box[3] - logo.height), logo)
+            else:
+                draw.ellipse(box, fill=colors[layer["color"]])
+                font_size = round(layer["font_size"] * scale)
+                left, top, right, bottom = font_registry.text_bbox(layer["text"], "sans", font_size, "regular")
+                center_x, center_y = (box[0] + box[2]) / 2, (box[1] + box[3]) / 2
+                draw.text((center_x - (left + right) / 2, center_y - (top + bottom) / 2), layer["text"],
+                          fill="#ffffff", font=font_registry.get("sans", font_size, "regular"))
+    return image
+
+def render_template(template="classic", texts=None, content_type="educational", aspect_ratio="1:1",
+                    palette=None, background_style=None, logo_path=None):
+    """Render a template to a PIL image
+
+    texts maps text box names to strings (e.g. {"title": topic}); boxes
+    without one use their "default". palette needs primary, secondary,
+    background and text colours.
+    """
+    if template not in TEMPLATES:
+        raise ValueError(f"Unknown template: {template}")
+    width, height = ASPECT_RATIOS[aspect_ratio] if isinstance(aspect_ratio, str) else aspect_ratio
+    texts = texts or {}
+    style = background_style or DEFAULT_BACKGROUNDS.get(content_type, "solid")
+    image = _static_layers(
+        template, width, height, style, tuple(sorted(palette.items())), logo_path, _logo_mtime(logo_path)
+    ).copy()
+    draw = ImageDraw.Draw(image)
+    scale = width / DESIGN_WIDTH
+    bottoms = {}  # Text box name -> y just below its last line, for "follows"
+
+    for layer in TEMPLATES[template]:
+        if layer["type"] == "scatter":
+            if content_type not in layer.get("content_types", [content_type]):
+                continue
+            top, bottom = round(layer["top"] * scale), height - round(layer["bottom"] * scale)
+            for i in range(layer["count"]):
+                size = round(random.randint(layer["min_size"], layer["max_size"]) * scale)
+                x = random.randint(size, width - size)
+                y = random.randint(top, bottom)
+                draw.ellipse([(x - size / 2, y - size / 2), (x + size / 2, y + size / 2)],
+                             fill=palette["secondary"] if i % 2 == 0 else palette["primary"])
+
+        elif layer["type"] == "text":
+            text = texts.get(layer["name"], layer.get("default", ""))
+            if not text:
+                continue
+            weight = layer.get("weight", "regular")
+            font_size = round(layer["font_size"] * scale)
+            line_height = round(layer["line_height"] * scale)
+            margin = round(layer["margin"] * scale)
+            font = font_registry.get("sans", font_size, weight)
+            lines = break_lines(text, width - 2 * margin, font_size, weight)
+
+            if "follows" in layer:
+                y = bottoms.get(layer["follows"], height // 2) + round(layer.get("gap", 0) * scale)
+            else:
+                y = round(height * layer["anchor"]) - (len(lines) * line_height) // 2
+
+            for line in lines:
+                x = (width - font_registry.text_length(line, "sans", font_size, weight)) // 2
+                if layer.get("shadow"):
+                    draw.text((x + 2, y + 2), line, fill=layer["shadow"], font=font)
+                draw.text((x, y), line, fill=palette[layer["color"]], font=font)
+                y += line_height
+            bottoms[layer["name"]] = y
+    return image
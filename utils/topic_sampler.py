@@ -0,0 +1,118 @@
+"""
+Deduplicating sampler over (category, topic, framework) combinations for generate_topic
+"""
+
+import os
+import random
+import sqlite3
+import time
+from config import DATA_DIR
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS topic_usage (
+    combo_key TEXT PRIMARY KEY,
+    content_type TEXT NOT NULL,
+    category TEXT NOT NULL,
+    topic TEXT NOT NULL,
+    framework TEXT NOT NULL,
+    uses INTEGER NOT NULL DEFAULT 0,
+    last_used_at REAL,
+    title TEXT
+);
+CREATE INDEX IF NOT EXISTS topic_usage_type ON topic_usage (content_type, last_used_at);
+"""
+
+class TopicSampler:
+    """Draws topic combinations without replacement, remembering usage and titles across runs
+
+    Every (category, specific topic, framework) combination for a content type
+    is drawn once before any is reused. Among the least used combinations,
+    ones whose specific topic appeared in the last `recent_window` draws are
+    down-weighted by `recency_penalty`, so "selenium deficiency" doesn't come
+    back three times in a row under different frameworks.
+    """
+
+    def __init__(self, topic_categories, content_frameworks, path=None, recent_window=10, recency_penalty=0.1):
+        self.topic_categories = topic_categories
+        self.content_frameworks = content_frameworks
+        self.path = path or os.path.join(DATA_DIR, "topics.sqlite3")
+        self.recent_window = recent_window
+        self.recency_penalty = recency_penalty
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with self._connect() as db:
+            db.executescript(SCHEMA)
+
+    def _connect(self):
+        db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        db.row_factory = sqlite3.Row
+        return db
+
+    def combinations(self, content_type):
+        """Every combination available for a content type"""
+        return [
+            {
+                "key": f"{content_type}|{category}|{topic}|{framework}",
+                "content_type": content_type,
+                "category": category,
+                "topic": topic,
+                "framework": framework
+            }
+            for category, topics in self.topic_categories.items()
+            for topic in topics
+            for framework in self.content_frameworks[content_type]
+        ]
+
+    def draw(self, content_type):
+        """Pick and record the next combination; its "title" is set if one was cached earlier"""
+        combos = self.combinations(content_type)
+        db = self._connect()
+        try:
+            db.execute("BEGIN IMMEDIATE")
+            rows = {
+                row["combo_key"]: row
+                for row in db.execute("SELECT * FROM topic_usage WHERE content_type = ?", (content_type,))
+            }
+            uses = {combo["key"]: rows[combo["key"]]["uses"] if combo["key"] in rows else 0 for combo in combos}
+            fewest = min(uses.values())
+            candidates = [combo for combo in combos if uses[combo["key"]] == fewest]
+
+            recent_topics = {
+                row["topic"] for row in sorted(
+                    (row for row in rows.values() if row["last_used_at"]),
+                    key=lambda row: row["last_used_at"],
+                    reverse=True
+                )[:self.recent_window]
+            }
+            weights = [self.recency_penalty if combo["topic"] in recent_topics else 1.0 for combo in candidates]
+            combo = random.choices(candidates, weights=weights)[0]
+
+            db.execute(
+                "INSERT INTO topic_usage (combo_key, content_type, category, topic, framework, uses, last_used_at)"
+                " VALUES (?, ?, ?, ?, ?, 1, ?)"
+                " ON CONFLICT(combo_key) DO UPDATE SET uses = uses + 1, last_used_at = excluded.last_used_at",
+                (combo["key"], content_type, combo["category"], combo["topic"], combo["framework"], time.time())
+            )
+            db.execute("COMMIT")
+        except Exception:
+            db.execute("ROLLBACK")
+            raise
+        finally:
+            db.close()
+
+        cached = rows.get(combo["key"])
+        combo["title"] = cached["title"] if cached else None
+        return combo
+
+    def record_title(self, combo, title):
+        """Remember the generated title so the next draw of this combination skips the LLM"""
+        with self._connect() as db:
+            db.execute("UPDATE topic_usage SET title = ? WHERE combo_key = ?", (title, combo["key"]))
+
+    def coverage(self, content_type):
+        """Return (combinations used at least once, total combinations) for a content type"""
+        total = len(self.combinations(content_type))
+        with self._connect() as db:
+            used = db.execute(
+                "SELECT COUNT(*) FROM topic_usage WHERE content_type = ? AND uses > 0", (content_type,)
+            ).fetchone()[0]
+        return used, total
@@ -0,0 +1,98 @@
+"""
+Process-wide TTL cache with stale-while-revalidate refreshes
+"""
+
+import threading
+import time
+
+class TTLCache:
+    """Thread-safe cache whose expired entries keep being served while a background thread reloads them
+
+    Only a missing entry makes the caller wait for the loader. A failed
+    background refresh keeps the stale value until the next attempt. A failed
+    load of a missing entry is raised again to every caller for error_ttl
+    seconds instead of retried, so an unreachable API doesn't block each one.
+    """
+
+    def __init__(self, ttl, error_ttl=0):
+        self.ttl = ttl
+        self.error_ttl = error_ttl
+        self._entries = {}  # key -> (value, loaded_at)
+        self._errors = {}  # key -> (exception, failed_at) for the last failed load
+        self._refreshing = {}  # key -> threading.Event set when the refresh ends
+        self._lock = threading.Lock()
+
+    def get(self, key, loader):
+        """Return the cached value for key, loading it on a miss and refreshing it in the background once stale"""
+        with self._lock:
+            entry = self._entries.get(key)
+            pending = self._refreshing.get(key)
+        if entry is None and pending is not None:
+            # A warm-up is already fetching this key; wait for it instead of loading twice
+            pending.wait()
+            with self._lock:
+                entry = self._entries.get(key)
+        if entry is None:
+            error = self._recent_error(key)
+            if error is not None:
+                raise error
+            return self._load(key, loader)
+
+        value, loaded_at = entry
+        if time.monotonic() - loaded_at > self.ttl and self._recent_error(key) is None:
+            self.refresh_async(key, loader)
+        return value
+
+    def warm(self, key, loader):
+        """Start loading key in the background if nothing is cached yet"""
+        with self._lock:
+            cached = key in self._entries
+        if not cached and self._recent_error(key) is None:
+            self.refresh_async(key, loader)
+
+    def refresh_async(self, key, loader):
+        """Reload key on a daemon thread; at most one refresh per key runs at a time"""
+        with self._lock:
+            if key in self._refreshing:
+                return
+            done = self._refreshing[key] = threading.Event()
+
+        def refresh():
+            try:
+                self._load(key, loader)
+            except Exception as e:
+                print(f"Error refreshing cached {key}: {e}")
+            finally:
+                with self._lock:
+                    self._refreshing.pop(key, None)
+                done.set()
+
+        threading.Thread(target=refresh, name=f"ttl-refresh-{key}", daemon=True).start()
+
+    def invalidate(self, key=None):
+        """Drop one key, or every key when none is given"""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+                self._errors.clear()
+            else:
+                self._entries.pop(key, None)
+                self._errors.pop(key, None)
+
+    def _recent_error(self, key):
+        """The last load error for key if it is younger than error_ttl, else None"""
+        with self._lock:
+            error, failed_at = self._errors.get(key, (None, 0))
+        return error if time.monotonic() - failed_at < self.error_ttl else None
+
+    def _load(self, key, loader):
+        try:
+            value = loader()
+        except Exception as e:
+            with self._lock:
+                self._errors[key] = (e, time.monotonic())
+            raise
+        with self._lock:
+            self._entries[key] = (value, time.monotonic())
+            self._errors.pop(key, None)
+        return value